@@ -120,10 +120,11 @@ export const pollUntilComplete = async (scanId, intervalMs = 2000, onProgress =
  * Get captured evidence for a scan
  * @param {string} scanId - Scan ID to get evidence for
  * @param {boolean} includeImages - Include base64 thumbnails
+ * @param {boolean} includeSummary - Include the per-scan evidence summary
  * @returns {Promise<Object>}
  */
-export const getEvidence = async (scanId, includeImages = true) => {
-    const url = `${ENDPOINTS.EVIDENCE(scanId)}?include_images=${includeImages}`;
+export const getEvidence = async (scanId, includeImages = true, includeSummary = false) => {
+    const url = `${ENDPOINTS.EVIDENCE(scanId)}?include_images=${includeImages}&include_summary=${includeSummary}`;
     const response = await fetch(url);
 
     if (!response.ok) {
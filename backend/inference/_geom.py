@@ -0,0 +1,121 @@
+"""
+Geometry Kernels for SafeNest AI
+================================
+Bounding-box math shared by the inference modules (IoU, NMS, tracking).
+
+Uses Numba JIT compilation when available; falls back to NumPy otherwise.
+Compiled kernels are cached on disk, so the compile cost is paid once per
+version.
+"""
+
+import numpy as np
+
+try:
+    from numba import njit, prange
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+
+if HAS_NUMBA:
+    @njit(cache=True, parallel=True, fastmath=True)
+    def nms(boxes: np.ndarray, scores: np.ndarray, iou_thr: float) -> np.ndarray:
+        """
+        Greedy non-maximum suppression.
+
+        Args:
+            boxes: (N, 4) float32 array of xyxy boxes
+            scores: (N,) float32 array of confidences
+            iou_thr: Boxes overlapping a kept box above this IoU are dropped
+
+        Returns:
+            (N,) boolean keep mask; ties go to the earlier box
+        """
+        n = boxes.shape[0]
+        order = np.argsort(-scores, kind='mergesort')
+        areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+        keep = np.zeros(n, dtype=np.bool_)
+        suppressed = np.zeros(n, dtype=np.bool_)
+
+        for oi in range(n):
+            i = order[oi]
+            if suppressed[i]:
+                continue
+            keep[i] = True
+
+            for oj in prange(oi + 1, n):
+                j = order[oj]
+                if suppressed[j]:
+                    continue
+                w = min(boxes[i, 2], boxes[j, 2]) - max(boxes[i, 0], boxes[j, 0])
+                h = min(boxes[i, 3], boxes[j, 3]) - max(boxes[i, 1], boxes[j, 1])
+                if w <= 0 or h <= 0:
+                    continue
+                intersection = w * h
+                union = areas[i] + areas[j] - intersection
+                if union > 0 and intersection / union > iou_thr:
+                    suppressed[j] = True
+
+        return keep
+
+    @njit(cache=True)
+    def class_iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray,
+                         classes_a: np.ndarray, classes_b: np.ndarray,
+                         out: np.ndarray) -> np.ndarray:
+        """
+        Pairwise IoU restricted to same-class pairs, fused in one pass.
+
+        Args:
+            boxes_a: (N, 4) float64 array of xyxy boxes
+            boxes_b: (M, 4) float64 array of xyxy boxes
+            classes_a: (N,) integer class codes for boxes_a
+            classes_b: (M,) integer class codes for boxes_b
+            out: (N, M) float64 array to fill; cross-class pairs get 0
+
+        Returns:
+            out
+        """
+        n = boxes_a.shape[0]
+        m = boxes_b.shape[0]
+        for i in range(n):
+            ax1 = boxes_a[i, 0]
+            ay1 = boxes_a[i, 1]
+            ax2 = boxes_a[i, 2]
+            ay2 = boxes_a[i, 3]
+            area_a = (ax2 - ax1) * (ay2 - ay1)
+            for j in range(m):
+                if classes_a[i] != classes_b[j]:
+                    out[i, j] = 0.0
+                    continue
+                w = min(ax2, boxes_b[j, 2]) - max(ax1, boxes_b[j, 0])
+                h = min(ay2, boxes_b[j, 3]) - max(ay1, boxes_b[j, 1])
+                intersection = max(w, 0.0) * max(h, 0.0)
+                area_b = (boxes_b[j, 2] - boxes_b[j, 0]) * (boxes_b[j, 3] - boxes_b[j, 1])
+                union = area_a + area_b - intersection
+                out[i, j] = intersection / union if union > 0 else 0.0
+        return out
+
+else:
+    def nms(boxes: np.ndarray, scores: np.ndarray, iou_thr: float) -> np.ndarray:
+        """Greedy non-maximum suppression (NumPy fallback, same contract)."""
+        from .temporal_tracker import iou_matrix
+
+        ious = iou_matrix(boxes, boxes)
+        keep = np.zeros(len(boxes), dtype=bool)
+        suppressed = np.zeros(len(boxes), dtype=bool)
+        for i in np.argsort(-scores, kind='stable'):
+            if suppressed[i]:
+                continue
+            keep[i] = True
+            suppressed |= ious[i] > iou_thr
+        return keep
+
+    def class_iou_matrix(boxes_a: np.ndarray, boxes_b: np.ndarray,
+                         classes_a: np.ndarray, classes_b: np.ndarray,
+                         out: np.ndarray) -> np.ndarray:
+        """Pairwise same-class IoU (NumPy fallback, same contract)."""
+        from .temporal_tracker import iou_matrix
+
+        out[...] = iou_matrix(boxes_a, boxes_b, dtype=np.float64)
+        out[classes_a[:, None] != classes_b[None, :]] = 0.0
+        return out
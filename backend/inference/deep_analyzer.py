@@ -7,8 +7,17 @@ Includes segmentation, OCR, and structural assessment.
 
 import logging
 import asyncio
+import hashlib
+import io
+import os
+import platform
+import shutil
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass, field
 from datetime import datetime
 import numpy as np
@@ -16,6 +25,76 @@ import cv2
 
 logger = logging.getLogger(__name__)
 
+# Maximum number of files processed concurrently within a deep scan
+DEEP_SCAN_CONCURRENCY = int(os.getenv('DEEP_SCAN_CONCURRENCY', os.cpu_count() or 4))
+_scan_semaphore = asyncio.Semaphore(DEEP_SCAN_CONCURRENCY)
+
+# Maximum number of Tesseract processes running at once
+OCR_CONCURRENCY = int(os.getenv('OCR_CONCURRENCY', os.cpu_count() or 4))
+_ocr_semaphore = asyncio.Semaphore(OCR_CONCURRENCY)
+
+# Images decoded ahead of the analysis slots (bounds preload memory)
+IMAGE_PRELOAD_DEPTH = int(os.getenv('IMAGE_PRELOAD_DEPTH', 2))
+_preload_semaphore = asyncio.Semaphore(DEEP_SCAN_CONCURRENCY + IMAGE_PRELOAD_DEPTH)
+
+# Number of sampled video frames per batched YOLO forward pass
+VIDEO_BATCH_SIZE = int(os.getenv('VIDEO_BATCH_SIZE', 8))
+
+# Rendered PDF pages are cached here, keyed by file content hash
+PDF_CACHE_DIR = Path(os.getenv('PDF_CACHE_DIR', Path.home() / '.cache' / 'safenest' / 'pdf'))
+
+# Size cap for the PDF page cache; least recently used documents go first
+PDF_CACHE_MAX_MB = float(os.getenv('PDF_CACHE_MAX_MB', 512))
+
+
+async def _bounded(coro):
+    """Await a coroutine while holding a deep scan concurrency slot."""
+    async with _scan_semaphore:
+        return await coro
+
+
+def merge_overlapping_defects(
+    defects: List[Dict[str, Any]],
+    iou_threshold: float = 0.5,
+) -> List[Dict[str, Any]]:
+    """
+    Greedy NMS across defects from all detectors.
+    
+    Keeps the highest-confidence box of every overlapping group (earlier
+    entries win ties) and preserves the input order of the kept defects.
+    Defects without a valid bbox are always kept.
+    """
+    from ._geom import nms
+    
+    boxed = [i for i, d in enumerate(defects) if len(d.get('bbox', [])) == 4]
+    if len(boxed) < 2:
+        return defects
+    
+    boxes = np.asarray([defects[i]['bbox'] for i in boxed], dtype=np.float32)
+    confidences = np.asarray([defects[i].get('confidence', 0) for i in boxed], dtype=np.float32)
+    
+    # Collapse exact pixel-grid duplicates first so NMS only sees distinct boxes
+    unique_idx = _unique_box_indices(boxes, confidences)
+    keep = nms(boxes[unique_idx], confidences[unique_idx], iou_threshold)
+    
+    kept = {boxed[i] for i in unique_idx[keep]}
+    dropped = set(boxed) - kept
+    return [d for i, d in enumerate(defects) if i not in dropped]
+
+
+def _unique_box_indices(boxes: np.ndarray, confidences: np.ndarray) -> np.ndarray:
+    """
+    Indices of distinct boxes after rounding to the pixel grid.
+    
+    Among exact duplicates the highest-confidence (then earliest) box is
+    kept, matching what NMS would pick. Returned indices are sorted.
+    """
+    order = np.argsort(-confidences, kind='stable')
+    grid = np.ascontiguousarray(np.round(boxes[order]).astype(np.int32))
+    keys = grid.view([('', np.int32)] * 4)[:, 0]
+    _, first = np.unique(keys, return_index=True)
+    return np.sort(order[first])
+
 
 @dataclass
 class DeepScanResult:
@@ -40,7 +119,7 @@ class DeepAnalyzer:
     Comprehensive deep scan analyzer combining:
     - YOLOv8m-seg for defect segmentation
     - UNet for crack width analysis (placeholder)
-    - pytesseract for document extraction
+    - aiopytesseract for concurrent document extraction
     """
     
     def __init__(self):
@@ -48,7 +127,11 @@ class DeepAnalyzer:
         self.yolo_engine = None
         self.privacy_blur = None
         self.risk_scorer = None
+        self.image_analyzer = None
+        self.evidence_store = None
+        self._cv_pool = None
         self.ocr_engine = None
+        self.ocr_async = False
         self._initialized = False
     
     def _lazy_init(self):
@@ -62,9 +145,17 @@ class DeepAnalyzer:
         
         logger.info("Initializing Deep Analyzer models...")
         
+        from .image_analyzer import get_image_analyzer
+        from .evidence_store import get_evidence_store
+        
         self.yolo_engine = get_deep_scan_engine()
         self.privacy_blur = get_privacy_blur()
         self.risk_scorer = get_risk_scorer()
+        self.image_analyzer = get_image_analyzer('medium')
+        self.evidence_store = get_evidence_store()
+        
+        # Shared pool for the per-defect-type CV detectors
+        self._cv_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='cv-detector')
         
         # Initialize Roboflow cloud engine for improved crack detection
         try:
@@ -75,46 +166,88 @@ class DeepAnalyzer:
             self.roboflow_engine = None
         
         # Initialize OCR (lazy load to avoid import issues if not installed)
+        tesseract_cmd = self._find_tesseract()
         try:
-            import pytesseract
-            from PIL import Image
+            # aiopytesseract runs Tesseract as asyncio subprocesses, so several
+            # documents can be OCR'd in parallel without blocking the event loop
+            import aiopytesseract
+            from aiopytesseract import base_command
             
-            # Try to find Tesseract on Windows
-            import platform
-            if platform.system() == 'Windows':
-                import shutil
-                tesseract_path = shutil.which('tesseract')
-                if tesseract_path:
-                    pytesseract.pytesseract.tesseract_cmd = tesseract_path
-                else:
-                    # Common Windows installation paths
-                    possible_paths = [
-                        r'C:\Program Files\Tesseract-OCR\tesseract.exe',
-                        r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
-                        r'C:\Tesseract-OCR\tesseract.exe',
-                    ]
-                    for path in possible_paths:
-                        if Path(path).exists():
-                            pytesseract.pytesseract.tesseract_cmd = path
-                            break
+            if tesseract_cmd:
+                base_command.TESSERACT_CMD = tesseract_cmd
             
-            # Test if Tesseract works
-            try:
-                pytesseract.get_tesseract_version()
-                self.ocr_engine = pytesseract
-                logger.info("pytesseract initialized successfully")
-            except Exception as e:
-                logger.warning(f"Tesseract binary not found or not working: {e}")
+            if shutil.which(base_command.TESSERACT_CMD):
+                self.ocr_engine = aiopytesseract
+                self.ocr_async = True
+                logger.info("aiopytesseract initialized successfully")
+            else:
+                logger.warning("Tesseract binary not found or not working")
                 logger.warning("OCR will be disabled. Install Tesseract-OCR from: https://github.com/UB-Mannheim/tesseract/wiki")
                 self.ocr_engine = None
                 
         except ImportError:
-            logger.warning("pytesseract not available - install with: pip install pytesseract")
-            self.ocr_engine = None
+            # Fall back to blocking pytesseract, run in a worker thread
+            try:
+                import pytesseract
+                
+                if tesseract_cmd:
+                    pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+                
+                # Test if Tesseract works
+                try:
+                    pytesseract.get_tesseract_version()
+                    self.ocr_engine = pytesseract
+                    self.ocr_async = False
+                    logger.info("pytesseract initialized successfully")
+                except Exception as e:
+                    logger.warning(f"Tesseract binary not found or not working: {e}")
+                    logger.warning("OCR will be disabled. Install Tesseract-OCR from: https://github.com/UB-Mannheim/tesseract/wiki")
+                    self.ocr_engine = None
+                    
+            except ImportError:
+                logger.warning("OCR not available - install with: pip install aiopytesseract")
+                self.ocr_engine = None
         
         self._initialized = True
         logger.info("Deep Analyzer initialization complete")
     
+    @staticmethod
+    def _find_tesseract() -> Optional[str]:
+        """Locate the Tesseract binary, probing common Windows install paths."""
+        tesseract_path = shutil.which('tesseract')
+        if tesseract_path or platform.system() != 'Windows':
+            return tesseract_path
+        
+        # Common Windows installation paths
+        possible_paths = [
+            r'C:\Program Files\Tesseract-OCR\tesseract.exe',
+            r'C:\Program Files (x86)\Tesseract-OCR\tesseract.exe',
+            r'C:\Tesseract-OCR\tesseract.exe',
+        ]
+        for path in possible_paths:
+            if Path(path).exists():
+                return path
+        return None
+    
+    async def _ocr_words(self, image) -> Tuple[List[str], List[float]]:
+        """Run word-level OCR, returning parallel lists of texts and confidences."""
+        async with _ocr_semaphore:
+            if self.ocr_async:
+                ocr_data = await self.ocr_engine.image_to_data(image)
+                return [d.text for d in ocr_data], [d.conf for d in ocr_data]
+            
+            ocr_data = await asyncio.to_thread(
+                self.ocr_engine.image_to_data, image, output_type=self.ocr_engine.Output.DICT
+            )
+            return ocr_data['text'], ocr_data['conf']
+    
+    async def _ocr_text(self, image) -> str:
+        """Run OCR and return the plain extracted text."""
+        async with _ocr_semaphore:
+            if self.ocr_async:
+                return await self.ocr_engine.image_to_string(image)
+            return await asyncio.to_thread(self.ocr_engine.image_to_string, image)
+    
     async def analyze(
         self,
         scan_id: str,
@@ -135,53 +268,69 @@ class DeepAnalyzer:
         Returns:
             DeepScanResult with all analysis data
         """
-        start_time = datetime.now()
+        start_time = time.perf_counter()
         self._lazy_init()
         
         result = DeepScanResult(
             scan_id=scan_id,
-            timestamp=start_time.isoformat(),
+            timestamp=datetime.now().isoformat(),
         )
         
         all_defects = []
         all_frame_scores = []
         
-        # Process images
+        # Process images concurrently
+        image_results = []
         if image_paths:
-            for img_path in image_paths:
-                try:
-                    img_result = await self._analyze_image(scan_id, img_path, user_context)
-                    all_defects.extend(img_result.get('defects', []))
-                    if 'score' in img_result:
-                        all_frame_scores.append(img_result)
-                    result.images_analyzed += 1
-                except Exception as e:
-                    logger.error(f"Error analyzing image {img_path}: {e}")
-        
-        # Process videos
+            img_results = await asyncio.gather(
+                *(self._preload_and_analyze_image(scan_id, p, user_context) for p in image_paths),
+                return_exceptions=True,
+            )
+            for img_path, img_result in zip(image_paths, img_results):
+                if isinstance(img_result, Exception):
+                    logger.error(f"Error analyzing image {img_path}: {img_result}")
+                    continue
+                all_defects.extend(img_result.get('defects', []))
+                if 'score' in img_result:
+                    all_frame_scores.append(img_result)
+                image_results.append(img_result)
+                result.images_analyzed += 1
+        
+        # Process videos concurrently
         temporal_summaries = []
         if video_paths:
-            for vid_path in video_paths:
-                try:
-                    vid_result = await self._analyze_video(vid_path, user_context)
-                    all_defects.extend(vid_result.get('defects', []))
-                    if 'frame_scores' in vid_result:
-                        all_frame_scores.extend(vid_result['frame_scores'])
-                    if 'temporal_analysis' in vid_result:
-                        temporal_summaries.append(vid_result['temporal_analysis'])
-                    result.videos_analyzed += 1
-                except Exception as e:
-                    logger.error(f"Error analyzing video {vid_path}: {e}")
-        
-        # Process documents
+            vid_results = await asyncio.gather(
+                *(_bounded(self._analyze_video(p, user_context)) for p in video_paths),
+                return_exceptions=True,
+            )
+            for vid_path, vid_result in zip(video_paths, vid_results):
+                if isinstance(vid_result, Exception):
+                    logger.error(f"Error analyzing video {vid_path}: {vid_result}")
+                    continue
+                all_defects.extend(vid_result.get('defects', []))
+                if 'frame_scores' in vid_result:
+                    all_frame_scores.extend(vid_result['frame_scores'])
+                if 'temporal_analysis' in vid_result:
+                    temporal_summaries.append(vid_result['temporal_analysis'])
+                result.videos_analyzed += 1
+        
+        # Process documents concurrently
         if document_paths:
-            for doc_path in document_paths:
-                try:
-                    doc_result = await self._analyze_document(doc_path)
-                    result.ocr_extractions.append(doc_result)
-                    result.documents_analyzed += 1
-                except Exception as e:
-                    logger.error(f"Error analyzing document {doc_path}: {e}")
+            doc_results = await asyncio.gather(
+                *(_bounded(self._analyze_document(p)) for p in document_paths),
+                return_exceptions=True,
+            )
+            for doc_path, doc_result in zip(document_paths, doc_results):
+                if isinstance(doc_result, Exception):
+                    logger.error(f"Error analyzing document {doc_path}: {doc_result}")
+                    continue
+                result.ocr_extractions.append(doc_result)
+                result.documents_analyzed += 1
+        
+        # Wait for background evidence writes to finish
+        for img_result in image_results:
+            evidence_task = img_result.pop('evidence_task', None)
+            img_result['evidence_id'] = await evidence_task if evidence_task else None
         
         # Aggregate results
         result.defects = all_defects
@@ -191,14 +340,8 @@ class DeepAnalyzer:
             result.risk_score = aggregated['score']
             result.risk_level = aggregated['risk_level']
         
-        # Generate structural assessment
-        result.structural_assessment = self._generate_structural_assessment(all_defects)
-        
-        # Generate maintenance prediction
-        result.maintenance_prediction = self._generate_maintenance_prediction(
-            all_defects,
-            result.ocr_extractions,
-        )
+        # Generate structural assessment and maintenance prediction
+        result.structural_assessment, result.maintenance_prediction = self._summarize(all_defects)
         
         # Aggregate temporal analysis
         if temporal_summaries:
@@ -215,7 +358,7 @@ class DeepAnalyzer:
              }
         
         # Calculate processing time
-        result.processing_time_seconds = (datetime.now() - start_time).total_seconds()
+        result.processing_time_seconds = time.perf_counter() - start_time
         
         logger.info(
             f"Deep scan complete: scan_id={scan_id}, "
@@ -224,9 +367,43 @@ class DeepAnalyzer:
         
         return result
     
-    async def _analyze_image(self, scan_id: str, image_path: Path, user_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    @staticmethod
+    def _read_image(image_path: Path) -> Optional[np.ndarray]:
+        """Read and decode an image file into a BGR array."""
+        data = np.fromfile(str(image_path), dtype=np.uint8)
+        if data.size == 0:
+            return None
+        return cv2.imdecode(data, cv2.IMREAD_COLOR)
+    
+    async def _preload_and_analyze_image(
+        self,
+        scan_id: str,
+        image_path: Path,
+        user_context: Optional[Dict[str, Any]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Two-stage image pipeline: decode (producer) then analyze (consumer).
+        
+        Decoding only needs a preload slot, so up to IMAGE_PRELOAD_DEPTH
+        images are read and decoded while earlier ones hold the analysis
+        slots for inference.
+        """
+        async with _preload_semaphore:
+            image = await asyncio.to_thread(self._read_image, image_path)
+            async with _scan_semaphore:
+                return await self._analyze_image(scan_id, image_path, user_context, image=image)
+    
+    async def _analyze_image(
+        self,
+        scan_id: str,
+        image_path: Path,
+        user_context: Optional[Dict[str, Any]] = None,
+        image: Optional[np.ndarray] = None,
+    ) -> Dict[str, Any]:
         """Analyze a single image with segmentation and CV-based defect detection."""
-        image = cv2.imread(str(image_path))
+        if image is None:
+            # Read + JPEG decode in a worker thread so other files keep progressing
+            image = await asyncio.to_thread(self._read_image, image_path)
         if image is None:
             raise ValueError(f"Could not read image: {image_path}")
         
@@ -242,78 +419,63 @@ class DeepAnalyzer:
             except Exception as e:
                 logger.warning(f"Roboflow detection failed: {e}")
         
-        # Run YOLO segmentation detection as fallback/supplement
-        try:
-            detection_result = self.yolo_engine.detect_with_segmentation(image)
-            # Only add YOLO defects that don't overlap with Roboflow detections
-            existing_boxes = set(tuple(d.get('bbox', [])) for d in all_defects)
-            for defect in detection_result.get('defects', []):
-                bbox_tuple = tuple(defect.get('bbox', []))
-                if bbox_tuple not in existing_boxes:
-                    defect['detection_method'] = 'yolo'
-                    all_defects.append(defect)
-        except Exception as e:
-            logger.warning(f"YOLO segmentation failed for {image_path}: {e}")
+        # Single YOLO pass: segmentation defects plus persons for privacy blur
+        detection_result = await self.yolo_engine.run_async(self.yolo_engine.detect_all, image)
+        
+        for defect in detection_result.get('defects', []):
+            defect['detection_method'] = 'yolo'
+            all_defects.append(defect)
         
         # Run CV-based image analyzer for crack/water/mold/rust detection
         try:
             logger.info(f"Running CV analysis on {image_path.name}")
-            from .image_analyzer import get_image_analyzer
             
-            analyzer = get_image_analyzer('medium')
-            cv_result = analyzer.analyze(
-                image,
-                detect_cracks=True,
-                detect_water_damage=True,
-                detect_mold=True,
-                detect_rust=True,
+            # OpenCV releases the GIL, so the detectors run on separate cores
+            loop = asyncio.get_running_loop()
+            detectors = (
+                self.image_analyzer.detect_cracks,
+                self.image_analyzer.detect_water,
+                self.image_analyzer.detect_mold,
+                self.image_analyzer.detect_rust,
             )
+            cv_results = await asyncio.gather(
+                *(loop.run_in_executor(self._cv_pool, detector, image) for detector in detectors)
+            )
+            cv_defects = [defect for defects in cv_results for defect in defects]
             
-            # Add unique CV detections
-            existing_boxes = set(tuple(d.get('bbox', [])) for d in all_defects)
-            cv_defects_count = 0
-            for defect in cv_result.get('defects', []):
-                bbox_tuple = tuple(defect.get('bbox', []))
-                if bbox_tuple not in existing_boxes:
-                    all_defects.append(defect)
-                    existing_boxes.add(bbox_tuple)
-                    cv_defects_count += 1
-            
-            logger.info(f"CV analyzer found {cv_defects_count} additional defects")
+            all_defects.extend(cv_defects)
+            logger.info(f"CV analyzer found {len(cv_defects)} defects")
         except Exception as e:
             logger.error(f"CV image analyzer failed: {e}", exc_info=True)
         
-        # Apply privacy blur if persons detected
-        person_result = self.yolo_engine.detect(image, detect_persons=True, detect_defects=False)
-        blurred_image = image
+        # Merge overlapping detections from Roboflow, YOLO and the CV analyzer
+        candidate_count = len(all_defects)
+        all_defects = merge_overlapping_defects(all_defects)
+        logger.info(f"Kept {len(all_defects)} of {candidate_count} defects after overlap merging")
+        
+        # Apply privacy blur in place if persons were found in the YOLO pass
+        persons = detection_result['persons']
         
-        if person_result['persons']:
-            blurred_image = self.privacy_blur.apply_blur(image, person_result['persons'])
+        if persons:
+            self.privacy_blur.apply_blur(image, persons, out=image)
             self.privacy_blur.log_enforcement(
                 scan_id='deep_scan',
                 frame_number=0,
-                persons_blurred=len(person_result['persons']),
+                persons_blurred=len(persons),
             )
-            image = blurred_image  # Update main image ref
         
-        # Save evidence if defects found
-        evidence_id = None
+        # Save evidence in the background so encoding + disk writes overlap
+        # with the rest of the scan; analyze() awaits the task
+        evidence_task = None
         if all_defects:
-            try:
-                from .evidence_store import get_evidence_store
-                evidence_store = get_evidence_store()
-                evidence = evidence_store.save_evidence(
-                    frame=blurred_image,
-                    detections=all_defects,
-                    scan_id=scan_id,
-                    frame_id=1,
-                    source='deep_scan_upload',
-                    persons=person_result['persons']
-                )
-                if evidence:
-                    evidence_id = evidence.evidence_id
-            except Exception as e:
-                logger.error(f"Failed to save evidence: {e}")
+            evidence_task = asyncio.create_task(self._save_evidence(
+                frame=image,
+                detections=all_defects,
+                scan_id=scan_id,
+                frame_id=1,
+                source='deep_scan_upload',
+                persons=persons
+            ))
         
         # Calculate risk score
         score_result = self.risk_scorer.calculate_score(
@@ -327,11 +489,89 @@ class DeepAnalyzer:
             'score': score_result['score'],
             'risk_level': score_result['risk_level'],
             'breakdown': score_result['breakdown'],
-            'evidence_id': evidence_id,
+            'evidence_task': evidence_task,
         }
     
-    async def _analyze_video(self, video_path: Path, user_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """Analyze video file with temporal tracking."""
+    async def _save_evidence(self, **kwargs) -> Optional[str]:
+        """Save evidence in a worker thread, returning the evidence ID."""
+        try:
+            evidence = await asyncio.to_thread(self.evidence_store.save_evidence, **kwargs)
+            return evidence.evidence_id if evidence else None
+        except Exception as e:
+            logger.error(f"Failed to save evidence: {e}")
+            return None
+    
+    def _read_sampled_frames(self, video_path: Path, target_fps: float):
+        """
+        Open a video and decode only the frames sampled at target_fps.
+        
+        Uses decord when installed (GPU context first, then CPU), which seeks
+        and decodes just the requested indices. Falls back to cv2.VideoCapture,
+        using grab() to skip frames without retrieving them, if decord is
+        missing, cannot open the file, or fails part-way through.
+        
+        Decoding is blocking: open and pull batches off the event loop.
+        
+        Returns:
+            Tuple of (total_frames, iterator of batches of up to
+            VIDEO_BATCH_SIZE (frame_idx, BGR frame) pairs)
+        """
+        try:
+            import decord
+        except ImportError:
+            decord = None
+        
+        if decord is not None:
+            try:
+                try:
+                    vr = decord.VideoReader(str(video_path), ctx=decord.gpu(0))
+                except Exception:
+                    vr = decord.VideoReader(str(video_path), ctx=decord.cpu(0))
+                
+                total_frames = len(vr)
+                fps = vr.get_avg_fps()
+                if fps <= 0: fps = 30 # Fallback
+                sample_interval = max(1, int(fps / target_fps))
+                indices = list(range(0, total_frames, sample_interval))
+            except Exception as e:
+                logger.warning(f"decord could not open {video_path.name}, using OpenCV: {e}")
+            else:
+                def decord_batches():
+                    last_idx = -1
+                    try:
+                        for start in range(0, len(indices), VIDEO_BATCH_SIZE):
+                            chunk = indices[start:start + VIDEO_BATCH_SIZE]
+                            batch = vr.get_batch(chunk).asnumpy()
+                            yield [
+                                (frame_idx, cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+                                for frame_idx, rgb in zip(chunk, batch)
+                            ]
+                            last_idx = chunk[-1]
+                    except Exception as e:
+                        logger.warning(
+                            f"decord failed on {video_path.name} after frame {last_idx}, "
+                            f"continuing with OpenCV: {e}"
+                        )
+                        _, rest = self._capture_batches(video_path, target_fps, skip_until=last_idx)
+                        yield from rest
+                
+                return total_frames, decord_batches()
+        
+        return self._capture_batches(video_path, target_fps)
+    
+    @staticmethod
+    def _capture_batches(video_path: Path, target_fps: float, skip_until: int = -1):
+        """
+        cv2.VideoCapture reader for _read_sampled_frames.
+        
+        Args:
+            video_path: Video file
+            target_fps: Sampling rate
+            skip_until: Frames up to this index are skipped (already read)
+            
+        Returns:
+            Tuple of (total_frames, iterator of frame batches)
+        """
         cap = cv2.VideoCapture(str(video_path))
         if not cap.isOpened():
             raise ValueError(f"Could not open video: {video_path}")
@@ -339,10 +579,35 @@ class DeepAnalyzer:
         total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
         fps = cap.get(cv2.CAP_PROP_FPS)
         if fps <= 0: fps = 30 # Fallback
+        sample_interval = max(1, int(fps / target_fps))
         
+        def capture_batches():
+            frame_idx = 0
+            batch = []
+            try:
+                while cap.grab():
+                    if frame_idx % sample_interval == 0 and frame_idx > skip_until:
+                        ret, frame = cap.retrieve()
+                        if not ret:
+                            break
+                        batch.append((frame_idx, frame))
+                        if len(batch) >= VIDEO_BATCH_SIZE:
+                            yield batch
+                            batch = []
+                    frame_idx += 1
+            finally:
+                cap.release()
+            if batch:
+                yield batch
+        
+        return total_frames, capture_batches()
+    
+    async def _analyze_video(self, video_path: Path, user_context: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Analyze video file with temporal tracking."""
         # Sample at least 5 FPS for tracking, or every frame if fps < 5
-        target_fps = 5.0
-        sample_interval = max(1, int(fps / target_fps))
+        total_frames, sampled_batches = await asyncio.to_thread(
+            self._read_sampled_frames, video_path, 5.0
+        )
         
         # Initialize temporal tracker
         try:
@@ -354,45 +619,58 @@ class DeepAnalyzer:
         
         all_defects = []
         frame_scores = []
-        frame_idx = 0
         
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+        # Sampled frames of the current batched forward pass
+        pending_frames = []
+        pending_idxs = []
+        
+        async def flush_batch():
+            """Run one batched person + defect detection pass on the pending frames."""
+            batch_results = await self.yolo_engine.run_async(
+                self.yolo_engine.detect_batch, pending_frames, detect_persons=True, detect_defects=True
+            )
             
-            if frame_idx % sample_interval == 0:
-                # Detect and blur persons
-                person_result = self.yolo_engine.detect(
-                    frame, detect_persons=True, detect_defects=False
-                )
-                
-                if person_result['persons']:
-                    frame = self.privacy_blur.apply_blur(frame, person_result['persons'])
-                
-                # Detect defects
-                defect_result = self.yolo_engine.detect(
-                    frame, detect_persons=False, detect_defects=True
-                )
+            # Every frame of a video has the same size
+            frame_area = pending_frames[0].shape[0] * pending_frames[0].shape[1]
+            
+            for idx, frame, frame_result in zip(pending_idxs, pending_frames, batch_results):
+                if frame_result['persons']:
+                    self.privacy_blur.apply_blur(frame, frame_result['persons'], out=frame)
                 
-                current_defects = defect_result['defects']
+                current_defects = frame_result['defects']
                 all_defects.extend(current_defects)
                 
                 # Update temporal tracker
                 if tracker:
-                    tracker.update(current_defects, frame_idx)
+                    tracker.update(current_defects, idx)
                 
                 # Calculate frame score
                 score_result = self.risk_scorer.calculate_score(
                     current_defects,
-                    frame.shape[0] * frame.shape[1],
+                    frame_area,
                     user_context=user_context,
                 )
                 frame_scores.append(score_result)
             
-            frame_idx += 1
+            pending_frames.clear()
+            pending_idxs.clear()
         
-        cap.release()
+        try:
+            while True:
+                # Each batch is decoded in a worker thread
+                batch = await asyncio.to_thread(next, sampled_batches, None)
+                if batch is None:
+                    break
+                for frame_idx, frame in batch:
+                    pending_idxs.append(frame_idx)
+                    pending_frames.append(frame)
+                await flush_batch()
+        finally:
+            try:
+                # Releases the reader; raises if a cancelled pull still runs
+                sampled_batches.close()
+            except ValueError:
+                pass
         
         result = {
             'defects': all_defects,
@@ -419,36 +697,35 @@ class DeepAnalyzer:
         # For PDFs, would need pdf2image conversion
         if doc_path.suffix.lower() in ['.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif']:
             try:
-                # Use pytesseract to extract text with confidence scores
-                from PIL import Image
-                
-                # Open image
-                img = Image.open(str(doc_path))
+                if self.ocr_async:
+                    # Pipe the raw file bytes straight to Tesseract's stdin
+                    import aiofiles
+                    async with aiofiles.open(doc_path, 'rb') as f:
+                        image = await f.read()
+                else:
+                    from PIL import Image
+                    image = Image.open(str(doc_path))
                 
                 # Extract text with detailed data (includes confidence scores)
-                ocr_data = self.ocr_engine.image_to_data(img, output_type=self.ocr_engine.Output.DICT)
+                raw_texts, raw_confs = await self._ocr_words(image)
                 
-                # Parse results
-                extracted_text = []
-                full_text_parts = []
+                # Filter out empty text and low confidence (< 0) in one pass
+                texts = np.char.strip(np.asarray(raw_texts, dtype=str))
+                confs = np.asarray(raw_confs, dtype=np.float32).astype(np.int32)
+                mask = (confs >= 0) & (np.char.str_len(texts) > 0)
+                kept_texts = texts[mask].tolist()
+                kept_confs = (confs[mask] / 100.0).tolist()  # Convert to 0-1 scale
                 
-                for i in range(len(ocr_data['text'])):
-                    text = ocr_data['text'][i].strip()
-                    conf = int(ocr_data['conf'][i])
-                    
-                    # Filter out empty text and low confidence (< 0)
-                    if text and conf >= 0:
-                        extracted_text.append({
-                            'text': text,
-                            'confidence': conf / 100.0,  # Convert to 0-1 scale
-                        })
-                        full_text_parts.append(text)
+                extracted_text = [
+                    {'text': text, 'confidence': conf}
+                    for text, conf in zip(kept_texts, kept_confs)
+                ]
                 
                 return {
                     'path': str(doc_path),
                     'status': 'success',
                     'extracted_text': extracted_text,
-                    'full_text': ' '.join(full_text_parts),
+                    'full_text': ' '.join(kept_texts),
                 }
             except Exception as e:
                 logger.error(f"Error processing document {doc_path}: {e}")
@@ -461,23 +738,18 @@ class DeepAnalyzer:
         # For PDFs, convert to images first
         elif doc_path.suffix.lower() == '.pdf':
             try:
-                from pdf2image import convert_from_path
-                from PIL import Image
-                
-                # Convert PDF to images
-                images = convert_from_path(str(doc_path))
+                # Render pages in memory (blocking, keep it off the loop)
+                images = await asyncio.to_thread(self._render_pdf_pages, doc_path)
                 
-                all_text = []
-                page_results = []
+                if self.ocr_async:
+                    images = [self._encode_page(img) for img in images]
                 
-                for page_num, img in enumerate(images, 1):
-                    # Extract text from this page
-                    text = self.ocr_engine.image_to_string(img)
-                    all_text.append(text)
-                    page_results.append({
-                        'page': page_num,
-                        'text': text,
-                    })
+                # OCR all pages concurrently
+                all_text = await asyncio.gather(*(self._ocr_text(img) for img in images))
+                page_results = [
+                    {'page': page_num, 'text': text}
+                    for page_num, text in enumerate(all_text, 1)
+                ]
                 
                 return {
                     'path': str(doc_path),
@@ -499,42 +771,153 @@ class DeepAnalyzer:
             'reason': f'Unsupported format: {doc_path.suffix}',
         }
     
-    def _generate_structural_assessment(
+    @staticmethod
+    def _render_pdf_pages(doc_path: Path, dpi: int = 200) -> list:
+        """
+        Render PDF pages to PIL images, reusing cached renders when present.
+        
+        Pages are cached as PNGs under PDF_CACHE_DIR/<sha256>-<dpi>/, so
+        re-running a scan on the same document skips rendering entirely.
+        The cache is kept under PDF_CACHE_MAX_MB (see _trim_pdf_cache).
+        """
+        from PIL import Image
+        
+        digest = hashlib.sha256()
+        with open(doc_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        cache_dir = PDF_CACHE_DIR / f"{digest.hexdigest()}-{dpi}"
+        
+        if cache_dir.is_dir():
+            try:
+                pages = sorted(cache_dir.glob('page_*.png'), key=lambda p: int(p.stem[5:]))
+                images = []
+                for page_path in pages:
+                    with Image.open(page_path) as img:
+                        img.load()
+                        images.append(img)
+                # Mark as recently used for the size cap
+                os.utime(cache_dir)
+                return images
+            except OSError:
+                # Evicted while being read; render it again
+                pass
+        
+        images = DeepAnalyzer._render_pdf(doc_path, dpi)
+        
+        # Write into a unique temp dir and rename, so readers never see a
+        # partial cache and concurrent renders of one file don't collide
+        tmp_dir = None
+        try:
+            PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            tmp_dir = Path(tempfile.mkdtemp(prefix=f"{cache_dir.name}.", suffix='.tmp', dir=PDF_CACHE_DIR))
+            for i, img in enumerate(images):
+                img.save(tmp_dir / f"page_{i}.png")
+            tmp_dir.rename(cache_dir)
+        except OSError as e:
+            if not cache_dir.is_dir():
+                logger.warning(f"Could not cache rendered PDF pages: {e}")
+            # Otherwise another render got there first
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        else:
+            DeepAnalyzer._trim_pdf_cache()
+        
+        return images
+    
+    @staticmethod
+    def _trim_pdf_cache(max_bytes: Optional[int] = None):
+        """
+        Delete least recently used page caches until the total fits the cap.
+        
+        Args:
+            max_bytes: Size cap; defaults to PDF_CACHE_MAX_MB
+        """
+        if max_bytes is None:
+            max_bytes = int(PDF_CACHE_MAX_MB * 1024 * 1024)
+        
+        entries = []
+        total = 0
+        try:
+            for entry in os.scandir(PDF_CACHE_DIR):
+                if not entry.is_dir() or entry.name.endswith('.tmp'):
+                    continue
+                size = sum(f.stat().st_size for f in os.scandir(entry.path) if f.is_file())
+                entries.append((entry.stat().st_mtime, size, entry.path))
+                total += size
+        except OSError as e:
+            logger.warning(f"Could not scan PDF cache: {e}")
+            return
+        
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+    
+    @staticmethod
+    def _render_pdf(doc_path: Path, dpi: int) -> list:
+        """
+        Render PDF pages to PIL images.
+        
+        Uses pypdfium2, which renders in-process without temp files. Falls
+        back to pdf2image (forks pdftoppm) when pypdfium2 is not installed.
+        """
+        try:
+            import pypdfium2 as pdfium
+        except ImportError:
+            from pdf2image import convert_from_path
+            return convert_from_path(str(doc_path), dpi=dpi)
+        
+        pdf = pdfium.PdfDocument(str(doc_path))
+        try:
+            return [page.render(scale=dpi / 72).to_pil() for page in pdf]
+        finally:
+            pdf.close()
+    
+    @staticmethod
+    def _encode_page(img) -> bytes:
+        """Encode a PIL page image to PNG bytes for Tesseract's stdin."""
+        buffer = io.BytesIO()
+        img.save(buffer, format='PNG')
+        return buffer.getvalue()
+    
+    def _summarize(
         self,
         defects: List[Dict[str, Any]],
-    ) -> Dict[str, Any]:
-        """Generate structural integrity assessment."""
-        # Count defect types
-        defect_counts = {}
-        for d in defects:
-            dtype = d.get('class', 'unknown')
-            defect_counts[dtype] = defect_counts.get(dtype, 0) + 1
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Generate the structural assessment and maintenance prediction.
+        
+        Both are derived from a single pass over the defect classes.
+        
+        Returns:
+            Tuple of (structural_assessment, maintenance_prediction)
+        """
+        classes = [d.get('class', 'unknown') for d in defects]
+        defect_counts = Counter(classes)
+        has = {k: defect_counts[k] for k in ('crack', 'leak', 'water_damage', 'mold', 'mould')}
         
         # Assess structural concerns
         concerns = []
-        if defect_counts.get('crack', 0) > 3:
+        if has['crack'] > 3:
             concerns.append('Multiple cracks detected - structural review recommended')
-        if defect_counts.get('leak', 0) > 0 or defect_counts.get('water_damage', 0) > 0:
+        if has['leak'] > 0 or has['water_damage'] > 0:
             concerns.append('Water damage present - check for moisture infiltration')
-        if defect_counts.get('mold', 0) > 0 or defect_counts.get('mould', 0) > 0:
+        if has['mold'] > 0 or has['mould'] > 0:
             concerns.append('Mold detected - health hazard, requires remediation')
         
         overall = 'Stable' if len(concerns) == 0 else 'Needs Attention' if len(concerns) < 3 else 'Concerning'
         
-        return {
+        structural_assessment = {
             'overall_status': overall,
-            'defect_summary': defect_counts,
+            'defect_summary': dict(defect_counts),
             'concerns': concerns,
             'recommendation': 'Professional inspection recommended' if concerns else 'No immediate action required',
         }
-    
-    def _generate_maintenance_prediction(
-        self,
-        defects: List[Dict[str, Any]],
-        ocr_data: List[Dict[str, Any]],
-    ) -> Dict[str, Any]:
-        """Generate maintenance timeline prediction."""
-        urgency_score = len(defects) * 2
+        
+        # Maintenance timeline prediction
+        urgency_score = len(classes) * 2
         
         if urgency_score > 20:
             timeline = 'Immediate'
@@ -549,14 +932,22 @@ class DeepAnalyzer:
             timeline = 'Routine maintenance'
             cost_estimate = '$0-200'
         
-        return {
+        maintenance_prediction = {
             'urgency': timeline,
             'estimated_cost': cost_estimate,
-            'priority_items': [d.get('class', 'unknown') for d in defects[:5]],
+            'priority_items': classes[:5],
         }
+        
+        return structural_assessment, maintenance_prediction
+
+
+# Singleton instance
+_deep_analyzer_instance: Optional[DeepAnalyzer] = None
 
 
-# Factory function
 def get_deep_analyzer() -> DeepAnalyzer:
-    """Get deep analyzer instance."""
-    return DeepAnalyzer()
+    """Get or create deep analyzer instance."""
+    global _deep_analyzer_instance
+    if _deep_analyzer_instance is None:
+        _deep_analyzer_instance = DeepAnalyzer()
+    return _deep_analyzer_instance
@@ -5,13 +5,24 @@ Captures and persists frames where defects are detected.
 Applies privacy blur before saving. Integrates with Snowflake analytics.
 """
 
+import atexit
+import copy
+import hashlib
+import heapq
+import itertools
 import logging
-import uuid
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
 import base64
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
+from typing import List, Dict, Any, Iterator, Optional, Tuple, Union
+from dataclasses import dataclass, field, fields
 import json
 
 import cv2
@@ -19,6 +30,67 @@ import numpy as np
 
 logger = logging.getLogger(__name__)
 
+# libjpeg-turbo bindings (optional, falls back to OpenCV's encoder)
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJFLAG_FASTDCT, TJFLAG_PROGRESSIVE
+    HAS_TURBOJPEG = True
+except ImportError:
+    HAS_TURBOJPEG = False
+
+# Arrow columnar export (optional, bundled with the Snowflake connector)
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Compact serialization for spilled scan indices (optional; without it the
+# whole index stays in memory)
+try:
+    import msgpack
+    HAS_MSGPACK = True
+except ImportError:
+    HAS_MSGPACK = False
+
+# Background writer: max queued records, and records/latency per drain
+EVIDENCE_WRITE_QUEUE_SIZE = int(os.getenv('EVIDENCE_WRITE_QUEUE_SIZE', 256))
+EVIDENCE_WRITE_BATCH = 32
+EVIDENCE_WRITE_LINGER_S = 0.01
+
+# Segment fds left unwritten this long are closed (reopened on next write)
+EVIDENCE_SEGMENT_IDLE_S = float(os.getenv('EVIDENCE_SEGMENT_IDLE_S', 30))
+
+# Scans whose evidence index is kept in memory; older ones spill to disk
+EVIDENCE_HOT_SCANS = int(os.getenv('EVIDENCE_HOT_SCANS', 32))
+
+# Segment record header: image length, thumbnail length (little-endian u32)
+_RECORD_HEADER = struct.Struct('<II')
+_SEGMENT_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0)
+
+# Annotation colors (BGR) by class-name substring, first match wins
+SEVERITY_COLORS = (
+    (('crack',), (0, 0, 255)),             # Red
+    (('water', 'leak'), (255, 128, 0)),    # Blue-ish
+    (('mold',), (0, 128, 0)),              # Green
+    (('rust',), (0, 128, 255)),            # Orange
+)
+DEFAULT_SEVERITY_COLOR = (0, 255, 255)     # Yellow
+
+
+@dataclass
+class DefectArray:
+    """
+    Struct-of-arrays view of one evidence item's detections.
+    
+    Built once at capture time so summaries and exports use NumPy
+    reductions instead of per-detection dict lookups.
+    """
+    bboxes: np.ndarray     # (N, 4) int32 xyxy, zeros when missing
+    conf: np.ndarray       # (N,) float64
+    area_pct: np.ndarray   # (N,) float64 affected_area_percent
+    cls_id: np.ndarray     # (N,) int32 index into EvidenceStore class vocab
+    method_id: np.ndarray  # (N,) int32 index into EvidenceStore method vocab
+
 
 @dataclass
 class EvidenceItem:
@@ -26,16 +98,36 @@ class EvidenceItem:
     evidence_id: str
     scan_id: str
     frame_id: int
-    timestamp: str
+    timestamp_ns: int  # wall clock, time.time_ns()
     source: str  # 'live_camera' | 'upload' | 'video_frame'
     detections: List[Dict[str, Any]]
     persons_blurred: int
     max_confidence: float
-    image_path: str
-    thumbnail_path: str
+    segment_path: str
+    image_offset: int
+    image_len: int
+    thumb_offset: int
+    thumb_len: int
+    arrays: Optional[DefectArray] = field(default=None, repr=False, compare=False)
+    
+    @property
+    def timestamp(self) -> str:
+        """Capture time as a local ISO-8601 string."""
+        seconds, ns = divmod(self.timestamp_ns, 1_000_000_000)
+        return datetime.fromtimestamp(seconds).replace(microsecond=ns // 1000).isoformat()
     
     def to_dict(self) -> Dict[str, Any]:
-        return asdict(self)
+        # The array view is internal; the API sees the detection dicts and
+        # an ISO timestamp
+        item = {}
+        for f in fields(self):
+            if f.name == 'arrays':
+                continue
+            if f.name == 'timestamp_ns':
+                item['timestamp'] = self.timestamp
+            else:
+                item[f.name] = copy.deepcopy(getattr(self, f.name))
+        return item
 
 
 class EvidenceStore:
@@ -52,6 +144,9 @@ class EvidenceStore:
         max_evidence_per_scan: int = 50,
         min_confidence_threshold: float = 0.4,
         thumbnail_size: tuple = (160, 120),
+        full_jpeg_quality: int = 85,
+        thumb_jpeg_quality: int = 70,
+        jpeg_optimize: bool = True,
     ):
         """
         Initialize evidence store.
@@ -61,6 +156,10 @@ class EvidenceStore:
             max_evidence_per_scan: Maximum evidence items per scan
             min_confidence_threshold: Minimum detection confidence to capture
             thumbnail_size: Size for thumbnail generation
+            full_jpeg_quality: JPEG quality for full evidence frames
+            thumb_jpeg_quality: JPEG quality for thumbnails
+            jpeg_optimize: Use optimized Huffman tables (OpenCV encoder;
+                libjpeg-turbo optimizes them for progressive output)
         """
         if storage_dir is None:
             storage_dir = Path(__file__).parent.parent / "evidence"
@@ -71,9 +170,74 @@ class EvidenceStore:
         self.max_evidence_per_scan = max_evidence_per_scan
         self.min_confidence_threshold = min_confidence_threshold
         self.thumbnail_size = thumbnail_size
+        self.full_jpeg_quality = full_jpeg_quality
+        self.thumb_jpeg_quality = thumb_jpeg_quality
+        self.jpeg_optimize = jpeg_optimize
+        
+        # In-memory index (use Snowflake/DB in production). An LRU of the
+        # most recently used scans; evicted scans are written to
+        # scan_<id>.idx and faulted back in when accessed.
+        self._evidence_index: "OrderedDict[str, List[EvidenceItem]]" = OrderedDict()
+        self._hot_cap = max(1, EVIDENCE_HOT_SCANS)
+        self._dirty_scans = set()
+        
+        # Per-scan min-heap of (max_confidence, seq, item): once a scan is at
+        # max_evidence_per_scan, a stronger capture replaces the weakest
+        self._evidence_heaps: Dict[str, List[Tuple[float, int, EvidenceItem]]] = {}
+        self._index_lock = threading.Lock()
+        self._heap_seq = itertools.count()
+        
+        # Per-scan capture counters; evidence ids are unique within a scan
+        self._id_counters: Dict[str, itertools.count] = {}
+        
+        # TurboJPEG encoder (needs the libjpeg-turbo shared library at runtime)
+        self._tj = None
+        if HAS_TURBOJPEG:
+            try:
+                self._tj = TurboJPEG()
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"libjpeg-turbo not found, using OpenCV JPEG encoder: {e}")
+        
+        # Each scan's evidence is appended as [header][jpeg][thumb] records
+        # to one segment file. Offsets are reserved at capture time; a daemon
+        # thread performs the writes, and until then bytes are served from
+        # _pending.
+        self._write_q: "queue.Queue[Tuple[str, Path, List[bytes], Tuple[int, int]]]" = queue.Queue(maxsize=EVIDENCE_WRITE_QUEUE_SIZE)
+        self._pending: Dict[Tuple[Path, int], bytes] = {}
+        self._pending_lock = threading.Lock()
+        self._seg_lock = threading.Lock()
+        self._seg_sizes: Dict[Path, int] = {}
+        # Reserved sizes the writer corrected after a failed write; picked up
+        # by the next reservation for that segment
+        self._seg_resets: Dict[Path, int] = {}
+        self._reset_lock = threading.Lock()
+        
+        # Writer-owned append fds with the real end of each file and the
+        # last write time; segments in _seg_release are closed after the
+        # writer's current batch
+        self._seg_fds: Dict[Path, int] = {}
+        self._seg_ends: Dict[Path, int] = {}
+        self._seg_last_write: Dict[Path, float] = {}
+        self._seg_release = set()
+        self._fd_lock = threading.Lock()
+        
+        # (segment_path, image_offset) of records whose write failed
+        self._failed_records = set()
         
-        # In-memory index (use Snowflake/DB in production)
-        self._evidence_index: Dict[str, List[EvidenceItem]] = {}
+        # Vocabularies for DefectArray class/method ids (append-only)
+        self._vocab_lock = threading.Lock()
+        self._class_vocab: Dict[str, int] = {}
+        self._method_vocab: Dict[str, int] = {}
+        self._class_names: List[str] = []
+        self._method_names: List[str] = []
+        
+        # Resolved annotation color per class name
+        self._color_table: Dict[str, Tuple[int, int, int]] = {}
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, name='evidence-writer', daemon=True
+        )
+        self._writer_thread.start()
+        atexit.register(self.flush)
         
         logger.info(f"EvidenceStore initialized: {self.storage_dir}")
     
@@ -95,14 +259,35 @@ class EvidenceStore:
         if not detections:
             return False
         
-        # Check if we've hit the limit for this scan
-        current_count = len(self._evidence_index.get(scan_id, []))
-        if current_count >= self.max_evidence_per_scan:
-            return False
-        
         # Check if any detection meets confidence threshold
         max_conf = max(d.get('confidence', 0) for d in detections)
-        return max_conf >= self.min_confidence_threshold
+        if max_conf < self.min_confidence_threshold:
+            return False
+        
+        # At the limit, only a capture stronger than the weakest one is kept
+        return not self.budget_exhausted(scan_id, max_conf)
+    
+    def budget_exhausted(self, scan_id: str, max_confidence: Optional[float] = None) -> bool:
+        """
+        Check whether a scan's evidence budget leaves no room for a capture.
+        
+        Args:
+            scan_id: Scan identifier
+            max_confidence: Best detection confidence of the candidate frame;
+                if given, a full budget still accepts frames stronger than
+                the weakest stored capture
+            
+        Returns:
+            True if a capture (of that confidence) would be discarded
+        """
+        heap = self._evidence_heaps.get(scan_id)
+        if heap is None and HAS_MSGPACK and self._index_path(scan_id).exists():
+            # Spilled (or written before a restart): the budget still applies
+            with self._index_lock:
+                _, heap = self._scan_index(scan_id)
+        if not heap or len(heap) < self.max_evidence_per_scan:
+            return False
+        return max_confidence is None or round(max_confidence, 3) <= heap[0][0]
     
     def save_evidence(
         self,
@@ -124,7 +309,8 @@ class EvidenceStore:
             frame_id: Frame number in scan
             source: Source of frame ('live_camera', 'upload', 'video_frame')
             persons: List of detected persons (for blur)
-            privacy_blur_fn: Function to apply privacy blur
+            privacy_blur_fn: Function to apply privacy blur, called as
+                fn(frame, persons, out=frame) on the working copy
             
         Returns:
             EvidenceItem if saved, None if skipped
@@ -132,33 +318,32 @@ class EvidenceStore:
         if not self.should_capture(detections, scan_id):
             return None
         
+        # Single working copy: blur and annotations never touch the caller's frame
+        frame = frame.copy()
+        
         # Apply privacy blur BEFORE saving
         if persons and privacy_blur_fn:
-            frame = privacy_blur_fn(frame.copy(), persons)
+            frame = privacy_blur_fn(frame, persons, out=frame)
             persons_blurred = len(persons)
         else:
             persons_blurred = 0
         
-        # Generate evidence ID and paths
-        evidence_id = str(uuid.uuid4())
-        scan_dir = self.storage_dir / scan_id
-        scan_dir.mkdir(parents=True, exist_ok=True)
-        
-        image_filename = f"evidence_{frame_id:04d}_{evidence_id[:8]}.jpg"
-        thumb_filename = f"thumb_{frame_id:04d}_{evidence_id[:8]}.jpg"
-        
-        image_path = scan_dir / image_filename
-        thumb_path = scan_dir / thumb_filename
+        evidence_id = self._next_evidence_id(scan_id)
+        timestamp_ns = time.time_ns()
         
         # Draw detection boxes on frame for evidence
-        annotated_frame = self._annotate_frame(frame.copy(), detections)
+        annotated_frame = self._annotate_frame(frame, detections)
         
-        # Save full image
-        cv2.imwrite(str(image_path), annotated_frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
-        
-        # Generate and save thumbnail
+        # Encode full image and thumbnail
+        image_bytes = self._encode_jpeg(annotated_frame, quality=self.full_jpeg_quality)
+        # A direct resize samples only thumbnail-size pixels; it is far cheaper
+        # than decoding the full JPEG again at 1/2..1/8 DCT scale
         thumbnail = cv2.resize(annotated_frame, self.thumbnail_size)
-        cv2.imwrite(str(thumb_path), thumbnail, [cv2.IMWRITE_JPEG_QUALITY, 75])
+        thumb_bytes = self._encode_jpeg(thumbnail, quality=self.thumb_jpeg_quality, progressive=True)
+        
+        # Append both as one record to the scan's segment
+        segment_path = self.storage_dir / f"scan_{scan_id}.seg"
+        image_offset, thumb_offset = self._append_record(scan_id, segment_path, image_bytes, thumb_bytes)
         
         # Calculate max confidence
         max_confidence = max(d.get('confidence', 0) for d in detections)
@@ -168,19 +353,22 @@ class EvidenceStore:
             evidence_id=evidence_id,
             scan_id=scan_id,
             frame_id=frame_id,
-            timestamp=datetime.now().isoformat(),
+            timestamp_ns=timestamp_ns,
             source=source,
             detections=detections,
             persons_blurred=persons_blurred,
             max_confidence=round(max_confidence, 3),
-            image_path=str(image_path),
-            thumbnail_path=str(thumb_path),
+            segment_path=str(segment_path),
+            image_offset=image_offset,
+            image_len=len(image_bytes),
+            thumb_offset=thumb_offset,
+            thumb_len=len(thumb_bytes),
+            arrays=self._to_arrays(detections),
         )
         
-        # Index evidence
-        if scan_id not in self._evidence_index:
-            self._evidence_index[scan_id] = []
-        self._evidence_index[scan_id].append(evidence)
+        if not self._index_evidence(evidence):
+            # Lost a race for the last slot to a stronger concurrent capture
+            return None
         
         logger.info(
             f"Evidence captured: scan={scan_id}, frame={frame_id}, "
@@ -189,12 +377,381 @@ class EvidenceStore:
         
         return evidence
     
+    def _index_evidence(self, evidence: EvidenceItem) -> bool:
+        """
+        Add evidence to its scan's index, keeping the top-K by confidence.
+        
+        Returns:
+            False if the budget is full and the item is not stronger than
+            the weakest stored one
+        """
+        with self._index_lock:
+            items, heap = self._scan_index(evidence.scan_id)
+            self._dirty_scans.add(evidence.scan_id)
+            entry = (evidence.max_confidence, next(self._heap_seq), evidence)
+            
+            if (evidence.segment_path, evidence.image_offset) in self._failed_records:
+                # The writer already failed to store this record's bytes
+                return False
+            
+            if len(heap) < self.max_evidence_per_scan:
+                heapq.heappush(heap, entry)
+            elif evidence.max_confidence > heap[0][0]:
+                # Evict the weakest; its segment bytes become dead space
+                _, _, weakest = heapq.heapreplace(heap, entry)
+                del items[next(i for i, ev in enumerate(items) if ev is weakest)]
+            else:
+                return False
+            
+            items.append(evidence)
+            return True
+    
+    def _next_evidence_id(self, scan_id: str) -> str:
+        """Allocate the next evidence id, continuing a spilled index's sequence."""
+        with self._index_lock:
+            # Faulting the index in seeds the counter from its stored ids
+            self._scan_index(scan_id)
+            return f"{next(self._id_counters.setdefault(scan_id, itertools.count(1))):08x}"
+    
+    def _scan_index(self, scan_id: str) -> Tuple[List[EvidenceItem], List[Tuple[float, int, EvidenceItem]]]:
+        """
+        Get (creating or faulting in) a scan's item list and heap, marking it
+        most recently used. Caller holds _index_lock.
+        """
+        items = self._evidence_index.get(scan_id)
+        if items is not None:
+            self._evidence_index.move_to_end(scan_id)
+            return items, self._evidence_heaps[scan_id]
+        
+        items = self._load_index(scan_id)
+        heap = [(ev.max_confidence, next(self._heap_seq), ev) for ev in items]
+        heapq.heapify(heap)
+        self._evidence_index[scan_id] = items
+        self._evidence_heaps[scan_id] = heap
+        if items and scan_id not in self._id_counters:
+            # Index written by an earlier process: continue its id sequence
+            last_id = max(int(ev.evidence_id, 16) for ev in items)
+            self._id_counters[scan_id] = itertools.count(last_id + 1)
+        
+        # Spill least recently used scans, never the one just faulted in.
+        # The index files are metadata only, and writing them under the
+        # lock keeps a concurrent fault-in from reading a stale copy.
+        if HAS_MSGPACK and len(self._evidence_index) > self._hot_cap:
+            for victim in [key for key in self._evidence_index if key != scan_id]:
+                if len(self._evidence_index) <= self._hot_cap or not self._spill_index(victim):
+                    break
+        
+        return items, heap
+    
+    def _index_path(self, scan_id: str) -> Path:
+        return self.storage_dir / f"scan_{scan_id}.idx"
+    
+    def _spill_index(self, scan_id: str) -> bool:
+        """
+        Drop a scan's index from memory, writing it out first if it changed.
+        
+        Returns:
+            False if the write failed and the scan was kept in memory
+        """
+        if scan_id in self._dirty_scans:
+            # Metadata and segment offsets only; pixels already live in the segment
+            rows = [
+                [getattr(ev, f.name) for f in fields(EvidenceItem) if f.name != 'arrays']
+                for ev in self._evidence_index[scan_id]
+            ]
+            index_path = self._index_path(scan_id)
+            tmp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+            try:
+                tmp_path.write_bytes(msgpack.packb(rows, default=_msgpack_default))
+                os.replace(tmp_path, index_path)
+            except (OSError, TypeError, ValueError) as e:
+                logger.warning(f"Failed to spill evidence index for scan {scan_id}: {e}")
+                tmp_path.unlink(missing_ok=True)
+                return False
+            self._dirty_scans.discard(scan_id)
+        
+        del self._evidence_index[scan_id]
+        self._evidence_heaps.pop(scan_id, None)
+        self._release_segment(self.storage_dir / f"scan_{scan_id}.seg")
+        return True
+    
+    def _load_index(self, scan_id: str) -> List[EvidenceItem]:
+        """Read a spilled scan index back, or [] if there is none."""
+        if not HAS_MSGPACK:
+            return []
+        try:
+            rows = msgpack.unpackb(self._index_path(scan_id).read_bytes())
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning(f"Failed to load evidence index for scan {scan_id}: {e}")
+            return []
+        
+        names = [f.name for f in fields(EvidenceItem) if f.name != 'arrays']
+        items = []
+        for row in rows:
+            ev = EvidenceItem(**dict(zip(names, row)))
+            if (ev.segment_path, ev.image_offset) in self._failed_records:
+                continue
+            ev.arrays = self._to_arrays(ev.detections)
+            items.append(ev)
+        return items
+    
+    def _scan_evidence(self, scan_id: str) -> List[EvidenceItem]:
+        """Snapshot of a scan's evidence list for readers."""
+        with self._index_lock:
+            if scan_id not in self._evidence_index and not self._index_path(scan_id).exists():
+                # Unknown scan: don't create an entry
+                return []
+            items, _ = self._scan_index(scan_id)
+            return list(items)
+    
+    def _append_record(self, scan_id: str, segment_path: Path, image_bytes: bytes, thumb_bytes: bytes) -> Tuple[int, int]:
+        """
+        Reserve space in a segment and queue the record for the writer.
+        
+        Returns:
+            (image_offset, thumb_offset) of the payloads within the segment
+        """
+        header = _RECORD_HEADER.pack(len(image_bytes), len(thumb_bytes))
+        
+        # Reservation and enqueue share a lock so queue order matches offsets
+        with self._seg_lock:
+            with self._reset_lock:
+                reset = self._seg_resets.pop(segment_path, None)
+            if reset is not None:
+                self._seg_sizes[segment_path] = reset
+            elif segment_path not in self._seg_sizes:
+                try:
+                    self._seg_sizes[segment_path] = segment_path.stat().st_size
+                except FileNotFoundError:
+                    self._seg_sizes[segment_path] = 0
+            
+            image_offset = self._seg_sizes[segment_path] + _RECORD_HEADER.size
+            thumb_offset = image_offset + len(image_bytes)
+            self._seg_sizes[segment_path] = thumb_offset + len(thumb_bytes)
+            
+            with self._pending_lock:
+                self._pending[(segment_path, image_offset)] = image_bytes
+                self._pending[(segment_path, thumb_offset)] = thumb_bytes
+            self._write_q.put((scan_id, segment_path, [header, image_bytes, thumb_bytes], (image_offset, thumb_offset)))
+        
+        return image_offset, thumb_offset
+    
+    def _writer_loop(self):
+        """Drain the write queue, issuing one gathered write per segment per batch."""
+        while True:
+            try:
+                batch = [self._write_q.get(timeout=EVIDENCE_SEGMENT_IDLE_S)]
+            except queue.Empty:
+                self._close_segments(idle_only=False)
+                continue
+            
+            deadline = time.monotonic() + EVIDENCE_WRITE_LINGER_S
+            while len(batch) < EVIDENCE_WRITE_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            failed = self._write_batch(batch)
+            if failed:
+                self._mark_failed(failed)
+            
+            with self._pending_lock:
+                for _, segment_path, _, offsets in batch:
+                    for offset in offsets:
+                        self._pending.pop((segment_path, offset), None)
+            self._close_segments(idle_only=True)
+            for _ in batch:
+                self._write_q.task_done()
+    
+    def _write_batch(self, batch: List[tuple]) -> List[Tuple[str, Path, int]]:
+        """
+        Write a batch of queued records, one gathered write per segment.
+        
+        A record is only written if it lands exactly at its reserved offset;
+        after a failed write the reserved size is reset to the real file size,
+        and records reserved before that reset no longer line up.
+        
+        Returns:
+            (scan_id, segment_path, image_offset) of records that were not stored
+        """
+        # Group records by segment, keeping queue (= offset) order
+        records_by_segment: Dict[Path, List[tuple]] = {}
+        for record in batch:
+            records_by_segment.setdefault(record[1], []).append(record)
+        
+        failed = []
+        with self._fd_lock:
+            for segment_path, records in records_by_segment.items():
+                try:
+                    fd = self._segment_fd(segment_path)
+                except OSError as e:
+                    logger.error(f"Failed to open evidence segment {segment_path}: {e}")
+                    failed.extend((r[0], segment_path, r[3][0]) for r in records)
+                    continue
+                
+                end = self._seg_ends[segment_path]
+                chunks, written = [], []
+                for scan_id, _, record_chunks, offsets in records:
+                    if offsets[0] - _RECORD_HEADER.size == end:
+                        chunks.extend(record_chunks)
+                        written.append((scan_id, segment_path, offsets[0]))
+                        end += sum(len(c) for c in record_chunks)
+                    else:
+                        failed.append((scan_id, segment_path, offsets[0]))
+                if not chunks:
+                    continue
+                
+                try:
+                    self._write_all(fd, chunks)
+                    self._seg_ends[segment_path] = end
+                except OSError as e:
+                    logger.error(f"Failed to write evidence segment {segment_path}: {e}")
+                    failed.extend(written)
+                    try:
+                        self._seg_ends[segment_path] = os.fstat(fd).st_size
+                    except OSError:
+                        self._close_segment(segment_path)
+                        self._seg_ends.pop(segment_path, None)
+                    reset = self._seg_ends.get(segment_path)
+                    if reset is None:
+                        try:
+                            reset = segment_path.stat().st_size
+                        except OSError:
+                            reset = 0
+                    with self._reset_lock:
+                        self._seg_resets[segment_path] = reset
+                self._seg_last_write[segment_path] = time.monotonic()
+        return failed
+    
+    def _segment_fd(self, segment_path: Path) -> int:
+        """Append fd for a segment, opened on first use. Caller holds _fd_lock."""
+        fd = self._seg_fds.get(segment_path)
+        if fd is None:
+            fd = os.open(segment_path, _SEGMENT_FLAGS, 0o644)
+            self._seg_fds[segment_path] = fd
+            self._seg_ends[segment_path] = os.fstat(fd).st_size
+            self._seg_last_write[segment_path] = time.monotonic()
+        return fd
+    
+    def _close_segment(self, segment_path: Path):
+        """Close a segment's fd if open. Caller holds _fd_lock."""
+        fd = self._seg_fds.pop(segment_path, None)
+        self._seg_ends.pop(segment_path, None)
+        self._seg_last_write.pop(segment_path, None)
+        self._seg_release.discard(segment_path)
+        if fd is not None:
+            os.close(fd)
+    
+    def _close_segments(self, idle_only: bool):
+        """Close released segments, and those idle for EVIDENCE_SEGMENT_IDLE_S (or all)."""
+        now = time.monotonic()
+        with self._fd_lock:
+            for segment_path in list(self._seg_fds):
+                if (not idle_only or segment_path in self._seg_release
+                        or now - self._seg_last_write[segment_path] >= EVIDENCE_SEGMENT_IDLE_S):
+                    self._close_segment(segment_path)
+            self._seg_release.clear()
+    
+    def _release_segment(self, segment_path: Path):
+        """Ask the writer to close a segment's fd once its queued records are written."""
+        with self._fd_lock:
+            self._seg_release.add(segment_path)
+    
+    def _mark_failed(self, failed: List[Tuple[str, Path, int]]):
+        """Drop evidence whose record could not be written from the index."""
+        with self._index_lock:
+            by_scan: Dict[str, set] = {}
+            for scan_id, segment_path, image_offset in failed:
+                self._failed_records.add((str(segment_path), image_offset))
+                by_scan.setdefault(scan_id, set()).add((str(segment_path), image_offset))
+            
+            for scan_id, keys in by_scan.items():
+                items = self._evidence_index.get(scan_id)
+                if items is None:
+                    # Spilled scans are filtered when faulted back in
+                    continue
+                kept = [ev for ev in items if (ev.segment_path, ev.image_offset) not in keys]
+                if len(kept) != len(items):
+                    items[:] = kept
+                    heap = [entry for entry in self._evidence_heaps[scan_id]
+                            if (entry[2].segment_path, entry[2].image_offset) not in keys]
+                    heapq.heapify(heap)
+                    self._evidence_heaps[scan_id] = heap
+                    self._dirty_scans.add(scan_id)
+        logger.error(f"Dropped {len(failed)} evidence record(s) that could not be written")
+    
+    @staticmethod
+    def _write_all(fd: int, chunks: List[bytes]):
+        """Write all chunks to fd, with one writev syscall where supported."""
+        if hasattr(os, 'writev'):
+            written = os.writev(fd, chunks)
+            total = sum(len(c) for c in chunks)
+            if written == total:
+                return
+            remainder = memoryview(b''.join(chunks))[written:]
+        else:
+            remainder = memoryview(b''.join(chunks))
+        
+        while remainder:
+            written = os.write(fd, remainder)
+            remainder = remainder[written:]
+    
+    def flush(self):
+        """Block until all queued evidence records are written."""
+        self._write_q.join()
+    
+    def _read_payload(self, segment_path: Path, offset: int, length: int) -> Optional[bytes]:
+        """Read a payload from a segment, including records still queued for writing."""
+        with self._pending_lock:
+            data = self._pending.get((segment_path, offset))
+        if data is not None:
+            return data
+        if not segment_path.exists():
+            return None
+        
+        if hasattr(os, 'pread'):
+            fd = os.open(segment_path, os.O_RDONLY)
+            try:
+                return os.pread(fd, length, offset)
+            finally:
+                os.close(fd)
+        with open(segment_path, 'rb') as f:
+            f.seek(offset)
+            return f.read(length)
+    
+    def _encode_jpeg(self, image: np.ndarray, quality: int, progressive: bool = False) -> bytes:
+        """Encode a BGR image to JPEG bytes, via libjpeg-turbo when available."""
+        if self._tj is not None:
+            flags = TJFLAG_FASTDCT | (TJFLAG_PROGRESSIVE if progressive else 0)
+            return self._tj.encode(
+                np.ascontiguousarray(image),
+                quality=quality,
+                pixel_format=TJPF_BGR,
+                flags=flags,
+            )
+        
+        params = [
+            cv2.IMWRITE_JPEG_QUALITY, quality,
+            cv2.IMWRITE_JPEG_OPTIMIZE, int(self.jpeg_optimize),
+            cv2.IMWRITE_JPEG_PROGRESSIVE, int(progressive),
+        ]
+        ok, buffer = cv2.imencode('.jpg', image, params)
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return buffer.tobytes()
+    
     def _annotate_frame(
         self,
         frame: np.ndarray,
         detections: List[Dict[str, Any]],
     ) -> np.ndarray:
-        """Draw detection boxes and labels on frame."""
+        """Draw detection boxes and labels on frame (in place)."""
         for det in detections:
             bbox = det.get('bbox', [])
             if len(bbox) != 4:
@@ -205,16 +762,9 @@ class EvidenceStore:
             defect_class = det.get('class', 'defect')
             
             # Color based on severity
-            if 'crack' in defect_class.lower():
-                color = (0, 0, 255)  # Red
-            elif 'water' in defect_class.lower() or 'leak' in defect_class.lower():
-                color = (255, 128, 0)  # Blue-ish
-            elif 'mold' in defect_class.lower():
-                color = (0, 128, 0)  # Green
-            elif 'rust' in defect_class.lower():
-                color = (0, 128, 255)  # Orange
-            else:
-                color = (0, 255, 255)  # Yellow
+            color = self._color_table.get(defect_class)
+            if color is None:
+                color = self._resolve_color(defect_class)
             
             # Draw box
             cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
@@ -240,6 +790,16 @@ class EvidenceStore:
         
         return frame
     
+    def _resolve_color(self, defect_class: str) -> Tuple[int, int, int]:
+        """Match a class name against SEVERITY_COLORS and cache the result."""
+        name = defect_class.lower()
+        color = next(
+            (c for keys, c in SEVERITY_COLORS if any(k in name for k in keys)),
+            DEFAULT_SEVERITY_COLOR,
+        )
+        self._color_table[defect_class] = color
+        return color
+    
     def get_evidence(
         self,
         scan_id: str,
@@ -255,25 +815,121 @@ class EvidenceStore:
         Returns:
             List of evidence items
         """
-        evidence_list = self._evidence_index.get(scan_id, [])
+        return self._evidence_dicts(scan_id, self._scan_evidence(scan_id), include_images)
+    
+    def get_evidence_with_summary(
+        self,
+        scan_id: str,
+        include_images: bool = False,
+        include_summary: bool = True,
+    ) -> Tuple[List[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Get a scan's evidence and its summary from one index lookup.
         
-        results = []
-        for ev in evidence_list:
-            item = ev.to_dict()
+        Args:
+            scan_id: Scan identifier
+            include_images: If True, include base64 encoded images
+            include_summary: If False, skip the summary aggregation
             
-            if include_images:
-                # Load and encode thumbnail
-                try:
-                    thumb_path = Path(ev.thumbnail_path)
-                    if thumb_path.exists():
-                        with open(thumb_path, 'rb') as f:
-                            item['thumbnail_base64'] = base64.b64encode(f.read()).decode('utf-8')
-                except Exception as e:
-                    logger.warning(f"Failed to load thumbnail: {e}")
+        Returns:
+            (evidence items as in get_evidence, summary as in
+            get_scan_summary or None)
+        """
+        evidence_list = self._scan_evidence(scan_id)
+        return (
+            self._evidence_dicts(scan_id, evidence_list, include_images),
+            self._summarize(scan_id, evidence_list) if include_summary else None,
+        )
+    
+    def iter_evidence(
+        self,
+        scan_id: str,
+        include_images: bool = False,
+        include_summary: bool = True,
+    ) -> Tuple[int, Iterator[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """
+        Like get_evidence_with_summary, but items are built lazily.
+        
+        Lets the API stream large listings (with thumbnails) one item at
+        a time instead of holding every encoded image at once.
+        
+        Args:
+            scan_id: Scan identifier
+            include_images: If True, include base64 encoded images
+            include_summary: If False, skip the summary aggregation
             
-            results.append(item)
+        Returns:
+            (item count, iterator of evidence item dicts, summary as in
+            get_scan_summary or None)
+        """
+        evidence_list = self._scan_evidence(scan_id)
+        return (
+            len(evidence_list),
+            self._iter_evidence_dicts(scan_id, evidence_list, include_images),
+            self._summarize(scan_id, evidence_list) if include_summary else None,
+        )
+    
+    def _evidence_dicts(
+        self,
+        scan_id: str,
+        evidence_list: List[EvidenceItem],
+        include_images: bool,
+    ) -> List[Dict[str, Any]]:
+        """API dicts for evidence items, with thumbnails if requested."""
+        return list(self._iter_evidence_dicts(scan_id, evidence_list, include_images))
+    
+    def _iter_evidence_dicts(
+        self,
+        scan_id: str,
+        evidence_list: List[EvidenceItem],
+        include_images: bool,
+    ) -> Iterator[Dict[str, Any]]:
+        """Yield API dicts for evidence items, with thumbnails if requested."""
+        # Map the scan's segment once; thumbnails are encoded straight from
+        # memoryview slices of it without intermediate byte copies
+        segment = self._map_segment(self.storage_dir / f"scan_{scan_id}.seg") if include_images else None
+        
+        try:
+            for ev in evidence_list:
+                item = ev.to_dict()
+                
+                if include_images:
+                    # Load and encode thumbnail
+                    try:
+                        thumb_base64 = self._thumbnail_base64(segment, ev)
+                        if thumb_base64 is not None:
+                            item['thumbnail_base64'] = thumb_base64
+                    except Exception as e:
+                        logger.warning(f"Failed to load thumbnail: {e}")
+                
+                yield item
+        finally:
+            if segment is not None:
+                segment.close()
+    
+    @staticmethod
+    def _map_segment(segment_path: Path) -> Optional[mmap.mmap]:
+        """Read-only mmap of a segment file, or None if it is missing or empty."""
+        try:
+            with open(segment_path, 'rb') as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+    
+    def _thumbnail_base64(self, segment: Optional[mmap.mmap], ev: EvidenceItem) -> Optional[str]:
+        """Base64-encode a thumbnail, from a zero-copy segment view where possible."""
+        with self._pending_lock:
+            data = self._pending.get((Path(ev.segment_path), ev.thumb_offset))
+        
+        end = ev.thumb_offset + ev.thumb_len
+        if data is None and segment is not None and end <= len(segment):
+            with memoryview(segment) as view, view[ev.thumb_offset:end] as thumb:
+                return base64.b64encode(thumb).decode('ascii')
         
-        return results
+        if data is None:
+            # Not mapped yet (written after the segment was mapped)
+            data = self._read_payload(Path(ev.segment_path), ev.thumb_offset, ev.thumb_len)
+        return base64.b64encode(data).decode('ascii') if data is not None else None
     
     def get_evidence_image(
         self,
@@ -292,25 +948,90 @@ class EvidenceStore:
         Returns:
             Image bytes or None
         """
-        evidence_list = self._evidence_index.get(scan_id, [])
+        ev = self._find_evidence(scan_id, evidence_id)
+        if ev is None:
+            return None
+        if thumbnail:
+            return self._read_payload(Path(ev.segment_path), ev.thumb_offset, ev.thumb_len)
+        return self._read_payload(Path(ev.segment_path), ev.image_offset, ev.image_len)
+    
+    def get_evidence_etag(
+        self,
+        scan_id: str,
+        evidence_id: str,
+        thumbnail: bool = False,
+    ) -> Optional[str]:
+        """
+        Get a strong HTTP ETag for an evidence image, without reading it.
         
-        for ev in evidence_list:
-            if ev.evidence_id == evidence_id:
-                path = Path(ev.thumbnail_path if thumbnail else ev.image_path)
-                if path.exists():
-                    with open(path, 'rb') as f:
-                        return f.read()
+        Evidence images never change once captured, so the tag only
+        depends on the item's identity and capture time.
         
+        Args:
+            scan_id: Scan identifier
+            evidence_id: Evidence identifier
+            thumbnail: If True, tag the thumbnail instead of the full image
+            
+        Returns:
+            Quoted ETag string, or None if the evidence is unknown
+        """
+        ev = self._find_evidence(scan_id, evidence_id)
+        if ev is None:
+            return None
+        variant = 'thumb' if thumbnail else 'full'
+        digest = hashlib.blake2b(
+            f"{ev.evidence_id}:{ev.timestamp_ns}:{variant}".encode(), digest_size=8
+        ).hexdigest()
+        return f'"{digest}"'
+    
+    def _find_evidence(self, scan_id: str, evidence_id: str) -> Optional[EvidenceItem]:
+        """Look up one evidence item of a scan by id."""
+        for ev in self._scan_evidence(scan_id):
+            if ev.evidence_id == evidence_id:
+                return ev
         return None
     
+    def _vocab_ids(self, names: List[str], vocab: Dict[str, int], table: List[str]) -> np.ndarray:
+        """Map names to stable integer ids, extending the vocabulary as needed."""
+        with self._vocab_lock:
+            for name in names:
+                if name not in vocab:
+                    vocab[name] = len(table)
+                    table.append(name)
+            return np.array([vocab[name] for name in names], dtype=np.int32)
+    
+    def _to_arrays(self, detections: List[Dict[str, Any]]) -> DefectArray:
+        """Build the struct-of-arrays view of a detection list."""
+        bboxes = np.zeros((len(detections), 4), dtype=np.int32)
+        for i, det in enumerate(detections):
+            bbox = det.get('bbox')
+            if bbox is not None and len(bbox) == 4:
+                bboxes[i] = bbox
+        
+        return DefectArray(
+            bboxes=bboxes,
+            conf=np.array([det.get('confidence', 0) for det in detections], dtype=np.float64),
+            area_pct=np.array([det.get('affected_area_percent', 0) for det in detections], dtype=np.float64),
+            cls_id=self._vocab_ids(
+                [det.get('class', 'unknown') for det in detections],
+                self._class_vocab, self._class_names,
+            ),
+            method_id=self._vocab_ids(
+                [det.get('detection_method', 'yolo') for det in detections],
+                self._method_vocab, self._method_names,
+            ),
+        )
+    
     def get_scan_summary(self, scan_id: str) -> Dict[str, Any]:
         """
         Get summary statistics for a scan's evidence.
         
         Returns data suitable for Snowflake analytics ingestion.
         """
-        evidence_list = self._evidence_index.get(scan_id, [])
-        
+        return self._summarize(scan_id, self._scan_evidence(scan_id))
+    
+    def _summarize(self, scan_id: str, evidence_list: List[EvidenceItem]) -> Dict[str, Any]:
+        """Summary statistics over a scan's evidence items."""
         if not evidence_list:
             return {
                 'scan_id': scan_id,
@@ -320,12 +1041,14 @@ class EvidenceStore:
                 'persons_blurred_total': 0,
             }
         
-        # Aggregate defect counts
-        defect_counts = {}
-        for ev in evidence_list:
-            for det in ev.detections:
-                defect_class = det.get('class', 'unknown')
-                defect_counts[defect_class] = defect_counts.get(defect_class, 0) + 1
+        # Aggregate defect counts, keyed in order of first appearance
+        cls_ids = np.concatenate([ev.arrays.cls_id for ev in evidence_list])
+        ids, first_seen, counts = np.unique(cls_ids, return_index=True, return_counts=True)
+        order = np.argsort(first_seen)
+        defect_counts = {
+            self._class_names[cls]: count
+            for cls, count in zip(ids[order].tolist(), counts[order].tolist())
+        }
         
         return {
             'scan_id': scan_id,
@@ -337,50 +1060,95 @@ class EvidenceStore:
             'last_detection': evidence_list[-1].timestamp,
         }
     
-    def export_for_snowflake(self, scan_id: str) -> List[Dict[str, Any]]:
+    def export_for_snowflake(self, scan_id: str, as_arrow: bool = False) -> Union[List[Dict[str, Any]], "pa.Table"]:
         """
         Export evidence data in Snowflake-compatible format.
         
         Returns structured data for ingestion into Snowflake warehouse
         for Cortex AI analysis and long-term trend tracking.
+        
+        Args:
+            scan_id: Scan identifier
+            as_arrow: Return a pyarrow.Table (one row per detection) for
+                Arrow-based ingestion instead of a list of row dicts
         """
-        evidence_list = self._evidence_index.get(scan_id, [])
-        
-        rows = []
-        for ev in evidence_list:
-            for det in ev.detections:
-                rows.append({
-                    'evidence_id': ev.evidence_id,
-                    'scan_id': ev.scan_id,
-                    'frame_id': ev.frame_id,
-                    'timestamp': ev.timestamp,
-                    'source': ev.source,
-                    'defect_class': det.get('class', 'unknown'),
-                    'confidence': det.get('confidence', 0),
-                    'bbox_x1': det.get('bbox', [0, 0, 0, 0])[0],
-                    'bbox_y1': det.get('bbox', [0, 0, 0, 0])[1],
-                    'bbox_x2': det.get('bbox', [0, 0, 0, 0])[2],
-                    'bbox_y2': det.get('bbox', [0, 0, 0, 0])[3],
-                    'affected_area_percent': det.get('affected_area_percent', 0),
-                    'persons_blurred': ev.persons_blurred,
-                    'detection_method': det.get('detection_method', 'yolo'),
-                })
-        
-        return rows
+        columns = self._export_columns(self._scan_evidence(scan_id))
+        
+        if as_arrow:
+            if not HAS_PYARROW:
+                raise ImportError("pyarrow is required for as_arrow=True")
+            return pa.table(columns)
+        
+        names = list(columns)
+        return [dict(zip(names, row)) for row in zip(*(col.tolist() for col in columns.values()))]
+    
+    def _export_columns(self, evidence_list: List[EvidenceItem]) -> Dict[str, np.ndarray]:
+        """Build the export as columns: per-evidence fields repeated per detection."""
+        counts = np.array([len(ev.arrays.conf) for ev in evidence_list], dtype=np.int64)
+        
+        def per_evidence(values, dtype=object) -> np.ndarray:
+            return np.repeat(np.array(values, dtype=dtype), counts)
+        
+        def per_detection(attr: str, empty_shape: tuple, dtype) -> np.ndarray:
+            if not evidence_list:
+                return np.empty(empty_shape, dtype=dtype)
+            return np.concatenate([getattr(ev.arrays, attr) for ev in evidence_list])
+        
+        bboxes = per_detection('bboxes', (0, 4), np.int32)
+        class_names = np.array(self._class_names, dtype=object)
+        method_names = np.array(self._method_names, dtype=object)
+        
+        return {
+            'evidence_id': per_evidence([ev.evidence_id for ev in evidence_list]),
+            'scan_id': per_evidence([ev.scan_id for ev in evidence_list]),
+            'frame_id': per_evidence([ev.frame_id for ev in evidence_list], np.int64),
+            'timestamp': per_evidence([ev.timestamp for ev in evidence_list]),
+            'source': per_evidence([ev.source for ev in evidence_list]),
+            'defect_class': class_names[per_detection('cls_id', (0,), np.int32)],
+            'confidence': per_detection('conf', (0,), np.float64),
+            'bbox_x1': bboxes[:, 0],
+            'bbox_y1': bboxes[:, 1],
+            'bbox_x2': bboxes[:, 2],
+            'bbox_y2': bboxes[:, 3],
+            'affected_area_percent': per_detection('area_pct', (0,), np.float64),
+            'persons_blurred': per_evidence([ev.persons_blurred for ev in evidence_list], np.int64),
+            'detection_method': method_names[per_detection('method_id', (0,), np.int32)],
+        }
     
     def cleanup_scan(self, scan_id: str):
         """Remove all evidence for a scan."""
-        scan_dir = self.storage_dir / scan_id
-        if scan_dir.exists():
-            import shutil
-            shutil.rmtree(scan_dir)
+        # Let queued writes land first so the segment can be closed and removed
+        self.flush()
         
-        if scan_id in self._evidence_index:
-            del self._evidence_index[scan_id]
+        segment_path = self.storage_dir / f"scan_{scan_id}.seg"
+        with self._fd_lock:
+            self._close_segment(segment_path)
+        with self._seg_lock:
+            self._seg_sizes.pop(segment_path, None)
+        with self._reset_lock:
+            self._seg_resets.pop(segment_path, None)
+        segment_path.unlink(missing_ok=True)
+        
+        with self._index_lock:
+            self._evidence_index.pop(scan_id, None)
+            self._evidence_heaps.pop(scan_id, None)
+            self._id_counters.pop(scan_id, None)
+            self._dirty_scans.discard(scan_id)
+            self._failed_records = {key for key in self._failed_records if key[0] != str(segment_path)}
+            self._index_path(scan_id).unlink(missing_ok=True)
         
         logger.info(f"Evidence cleaned up for scan: {scan_id}")
 
 
+def _msgpack_default(obj):
+    """Serialize NumPy scalars/arrays that end up in detection dicts."""
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError(f"Cannot serialize {type(obj).__name__}")
+
+
 # Singleton instance
 _evidence_store: Optional[EvidenceStore] = None
 
@@ -7,12 +7,22 @@ without requiring custom ML models.
 """
 
 import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 import cv2
 import numpy as np
 from typing import List, Dict, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Offload the analyzer's OpenCV pipeline to OpenCL via UMat (T-API); opt-in,
+# since on CPU-only OpenCL runtimes the transfers outweigh the gains
+CV_USE_OPENCL = os.getenv('CV_USE_OPENCL', '0') == '1'
+
+# Threads used to fan out the detectors within one analyze() call (<=1: serial)
+CV_ANALYZE_WORKERS = int(os.getenv('CV_ANALYZE_WORKERS', min(4, os.cpu_count() or 1)))
+
 
 class ImageAnalyzer:
     """
@@ -24,14 +34,42 @@ class ImageAnalyzer:
     - Contour analysis for shape-based defects
     """
     
-    def __init__(self, sensitivity: str = 'medium'):
+    # Structuring elements are read-only, so they are shared by all calls
+    _dilate_kernel = np.ones((3, 3), np.uint8)
+    _morph_kernel = np.ones((5, 5), np.uint8)
+    
+    def __init__(
+        self,
+        sensitivity: str = 'medium',
+        analysis_resolution: Optional[int] = 640,
+        use_opencl: Optional[bool] = None,
+    ):
         """
         Initialize analyzer.
         
         Args:
             sensitivity: 'low', 'medium', or 'high' detection sensitivity
+            analysis_resolution: Long-edge size images are downscaled to
+                before analysis (None = full resolution). Boxes and areas
+                are reported in original image coordinates.
+            use_opencl: Run filters on cv2.UMat via OpenCL (None = CV_USE_OPENCL).
+                Ignored when no OpenCL device is available.
         """
         self.sensitivity = sensitivity
+        self.analysis_resolution = analysis_resolution
+        
+        if use_opencl is None:
+            use_opencl = CV_USE_OPENCL
+        self.use_opencl = bool(use_opencl) and cv2.ocl.haveOpenCL()
+        if self.use_opencl:
+            cv2.ocl.setUseOpenCL(True)
+        
+        # OpenCV releases the GIL, so the independent crack and color
+        # sub-pipelines run in parallel. The OpenCL path stays serial on
+        # the device queue.
+        self._pool = None
+        if CV_ANALYZE_WORKERS > 1 and not self.use_opencl:
+            self._pool = ThreadPoolExecutor(max_workers=CV_ANALYZE_WORKERS, thread_name_prefix='cv-analyze')
         
         # Thresholds based on sensitivity
         thresholds = {
@@ -70,6 +108,14 @@ class ImageAnalyzer:
             },
         }
         
+        # Stacked (K, 3) bounds so several color masks share one buffer
+        self._color_index = {name: i for i, name in enumerate(self.color_ranges)}
+        self._color_lowers = np.stack([r['lower'] for r in self.color_ranges.values()]).astype(np.uint8)
+        self._color_uppers = np.stack([r['upper'] for r in self.color_ranges.values()]).astype(np.uint8)
+        
+        # CLAHE objects and the crack scratch buffer are per detector thread
+        self._local = threading.local()
+        
         logger.info(f"ImageAnalyzer initialized with {sensitivity} sensitivity")
     
     def analyze(
@@ -97,29 +143,41 @@ class ImageAnalyzer:
         img_h, img_w = image.shape[:2]
         total_pixels = img_h * img_w
         
-        # Convert to grayscale and HSV
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
-        
-        # Crack Detection
-        if detect_cracks:
-            crack_defects = self._detect_cracks(gray, image, total_pixels)
-            defects.extend(crack_defects)
+        # Work on a downscaled copy; results are mapped back by `scale`
+        image, scale = self._downscale(image)
+        image = self._to_device(image)
         
-        # Color-based defect detection
+        color_types = []
         if detect_rust:
-            rust_defects = self._detect_color_defect(hsv, image, 'rust', total_pixels)
-            defects.extend(rust_defects)
-        
+            color_types.append('rust')
         if detect_mold:
-            mold_defects = self._detect_color_defect(hsv, image, 'mold_green', total_pixels)
-            mold_defects += self._detect_color_defect(hsv, image, 'mold_black', total_pixels)
-            defects.extend(mold_defects)
-        
+            color_types += ['mold_green', 'mold_black']
         if detect_water_damage:
-            water_defects = self._detect_color_defect(hsv, image, 'water_stain', total_pixels)
-            water_defects += self._detect_color_defect(hsv, image, 'water_damage_brown', total_pixels)
-            defects.extend(water_defects)
+            color_types += ['water_stain', 'water_damage_brown']
+        
+        if self._pool is not None:
+            # Fan out: cracks and each color range as separate tasks,
+            # collected in the serial order
+            futures = []
+            if detect_cracks:
+                futures.append(self._pool.submit(self._cracks_from_bgr, image, total_pixels, scale))
+            if color_types:
+                hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+                futures += [
+                    self._pool.submit(self._detect_color_defects, hsv, [t], total_pixels, scale)
+                    for t in color_types
+                ]
+            for future in futures:
+                defects.extend(future.result())
+        else:
+            # Crack Detection (grayscale only converted when needed)
+            if detect_cracks:
+                defects.extend(self._cracks_from_bgr(image, total_pixels, scale))
+            
+            # Color-based defect detection (all enabled ranges in one batch)
+            if color_types:
+                hsv = cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+                defects.extend(self._detect_color_defects(hsv, color_types, total_pixels, scale))
         
         # Calculate overall damage score
         total_affected = sum(d.get('affected_area_percent', 0) for d in defects)
@@ -132,139 +190,282 @@ class ImageAnalyzer:
             'defect_count': len(defects),
         }
     
+    def detect_cracks(self, image: np.ndarray) -> List[Dict[str, Any]]:
+        """Run crack detection only (thread-safe, for parallel use)."""
+        img_h, img_w = image.shape[:2]
+        image, scale = self._downscale(image)
+        return self._cracks_from_bgr(self._to_device(image), img_h * img_w, scale)
+    
+    def detect_rust(self, image: np.ndarray) -> List[Dict[str, Any]]:
+        """Run rust/corrosion detection only (thread-safe, for parallel use)."""
+        img_h, img_w = image.shape[:2]
+        image, scale = self._downscale(image)
+        hsv = cv2.cvtColor(self._to_device(image), cv2.COLOR_BGR2HSV)
+        return self._detect_color_defects(hsv, ['rust'], img_h * img_w, scale)
+    
+    def detect_mold(self, image: np.ndarray) -> List[Dict[str, Any]]:
+        """Run mold detection only (thread-safe, for parallel use)."""
+        img_h, img_w = image.shape[:2]
+        image, scale = self._downscale(image)
+        hsv = cv2.cvtColor(self._to_device(image), cv2.COLOR_BGR2HSV)
+        return self._detect_color_defects(hsv, ['mold_green', 'mold_black'], img_h * img_w, scale)
+    
+    def detect_water(self, image: np.ndarray) -> List[Dict[str, Any]]:
+        """Run water damage detection only (thread-safe, for parallel use)."""
+        img_h, img_w = image.shape[:2]
+        image, scale = self._downscale(image)
+        hsv = cv2.cvtColor(self._to_device(image), cv2.COLOR_BGR2HSV)
+        return self._detect_color_defects(hsv, ['water_stain', 'water_damage_brown'], img_h * img_w, scale)
+    
+    def _downscale(self, image: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        Shrink an image to analysis_resolution on its long edge.
+        
+        Returns:
+            (image, scale) where scale maps original -> analysis pixels
+        """
+        if not self.analysis_resolution:
+            return image, 1.0
+        
+        img_h, img_w = image.shape[:2]
+        scale = min(1.0, self.analysis_resolution / max(img_h, img_w))
+        if scale >= 1.0:
+            return image, 1.0
+        
+        small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        return small, scale
+    
+    def _to_device(self, image: np.ndarray):
+        """Wrap an image in a UMat when OpenCL offload is enabled."""
+        return cv2.UMat(image) if self.use_opencl else image
+    
+    @staticmethod
+    def _contour_stats(contours, scale: float) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Areas and bounding rects of all contours, in original image pixels.
+        
+        Returns:
+            (areas, rects): float64 (N,) and int64 (N, 4) xywh arrays
+        """
+        areas = np.fromiter(map(cv2.contourArea, contours), dtype=np.float64, count=len(contours))
+        rects = np.array([cv2.boundingRect(c) for c in contours], dtype=np.int64).reshape(-1, 4)
+        if scale != 1.0:
+            inv = 1.0 / scale
+            areas = areas * inv * inv
+            rects = np.round(rects * inv).astype(np.int64)
+        return areas, rects
+    
+    def _cracks_from_bgr(self, image, total_pixels: int, scale: float) -> List[Dict[str, Any]]:
+        """Grayscale conversion plus crack detection, as one schedulable task."""
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return self._detect_cracks(gray, total_pixels, scale)
+    
     def _detect_cracks(
         self,
         gray: np.ndarray,
-        original: np.ndarray,
-        total_pixels: int
+        total_pixels: int,
+        scale: float = 1.0,
     ) -> List[Dict[str, Any]]:
-        """Detect cracks using edge detection and morphological operations."""
+        """Detect cracks using edge detection and morphological operations (overwrites gray)."""
         defects = []
         
+        if isinstance(gray, cv2.UMat):
+            edges = self._crack_edges_umat(gray)
+        else:
+            edges = self._crack_edges(gray)
+        
+        # Find contours; TC89-L1 keeps far fewer points than SIMPLE on
+        # ragged edge blobs, with the same bounding boxes
+        contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_TC89_L1)
+        
+        if not contours:
+            return defects
+        
+        # Area and bounding rectangle in original image pixels
+        areas, rects = self._contour_stats(contours, scale)
+        max_dim = rects[:, 2:].max(axis=1)
+        
+        # Filter by minimum area, and for elongated shapes (more likely to
+        # be cracks): aspect ratio = long side / (short side + 1)
+        aspect_ratio = max_dim / (rects[:, 2:].min(axis=1) + 1)
+        candidates = np.flatnonzero((areas >= self.params['min_area']) & (aspect_ratio > 2.0))
+        if candidates.size == 0:
+            return defects
+        
+        # Cracks have high perimeter-to-area ratio
+        perimeters = np.array([cv2.arcLength(contours[i], True) for i in candidates]) / scale
+        ratio = areas[candidates] / np.where(perimeters > 0, perimeters, 1.0)
+        keep = candidates[(perimeters > 0) & (ratio < 15)]
+        
+        # Estimate severity based on size and length
+        severe = max_dim[keep] > 200
+        moderate = max_dim[keep] > 100
+        severities = np.where(severe, 'severe', np.where(moderate, 'moderate', 'minor'))
+        confidences = np.where(severe, 0.85, np.where(moderate, 0.75, 0.65))
+        
+        for (x, y, w, h), area, severity, confidence in zip(
+            rects[keep].tolist(), areas[keep].tolist(), severities.tolist(), confidences.tolist()
+        ):
+            defects.append({
+                'bbox': [x, y, x + w, y + h],
+                'class': 'crack',
+                'confidence': confidence,
+                'severity': severity,
+                'affected_area_percent': round((area / total_pixels) * 100, 2),
+                'detection_method': 'cv_edge',
+            })
+        
+        return defects
+    
+    def _crack_edges(self, gray: np.ndarray) -> np.ndarray:
+        """Blur -> CLAHE -> Canny -> dilate, returning the dilated edge mask."""
+        # The stages ping-pong between two H×W buffers instead of allocating
+        # one per stage. Callers pass a gray image they no longer need.
+        work = gray
+        edges = self._edge_buffer(gray.shape)
+        
         # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        cv2.GaussianBlur(work, (5, 5), 0, dst=work)
         
         # Apply CLAHE for contrast enhancement
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        enhanced = clahe.apply(blurred)
+        self._get_clahe().apply(work, dst=edges)
         
         # Canny edge detection
-        edges = cv2.Canny(
-            enhanced,
+        cv2.Canny(
+            edges,
             self.params['edge_low'],
-            self.params['edge_high']
+            self.params['edge_high'],
+            edges=work,
         )
         
-        # Morphological operations to connect crack segments
-        kernel_h = np.ones((1, 5), np.uint8)
-        kernel_v = np.ones((5, 1), np.uint8)
-        
         # Dilate to connect nearby edges
-        dilated = cv2.dilate(edges, np.ones((3, 3), np.uint8), iterations=2)
-        
-        # Find contours
-        contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        cv2.dilate(work, self._dilate_kernel, dst=edges, iterations=2)
+        return edges
+    
+    def _crack_edges_umat(self, gray: cv2.UMat) -> np.ndarray:
+        """Same stages as _crack_edges on the OpenCL device; downloads the final mask."""
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        enhanced = self._get_clahe().apply(blurred)
+        edges = cv2.Canny(enhanced, self.params['edge_low'], self.params['edge_high'])
+        return cv2.dilate(edges, self._dilate_kernel, iterations=2).get()
+    
+    def _edge_buffer(self, shape: Tuple[int, ...]) -> np.ndarray:
+        """This thread's reusable scratch plane for the crack pipeline."""
+        buf = getattr(self._local, 'edge_buf', None)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, dtype=np.uint8)
+            self._local.edge_buf = buf
+        return buf
+    
+    def _get_clahe(self):
+        """Return this thread's CLAHE instance, creating it on first use."""
+        clahe = getattr(self._local, 'clahe', None)
+        if clahe is None:
+            clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+            self._local.clahe = clahe
+        return clahe
+    
+    def _color_masks(self, hsv: np.ndarray, defect_types: List[str]) -> np.ndarray:
+        """
+        Compute the cleaned-up color masks for several defect types.
         
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            
-            # Filter by minimum area
-            if area < self.params['min_area']:
-                continue
+        Args:
+            hsv: HSV image
+            defect_types: Keys of self.color_ranges
             
-            # Get bounding rectangle
-            x, y, w, h = cv2.boundingRect(contour)
+        Returns:
+            (K, H, W) uint8 mask stack, one slice per defect type
+        
+        Note:
+            One SIMD inRange per slice is faster than a merged HSV->bitmask
+            lookup table here, both the quantized gather form and an exact
+            per-channel cv2.LUT form, because unpacking K masks from the
+            bitmask costs more than the range checks it replaces.
+        """
+        if isinstance(hsv, cv2.UMat):
+            return self._color_masks_umat(hsv, defect_types)
+        
+        masks = np.empty((len(defect_types),) + hsv.shape[:2], dtype=np.uint8)
+        for mask, defect_type in zip(masks, defect_types):
+            i = self._color_index[defect_type]
+            cv2.inRange(hsv, self._color_lowers[i], self._color_uppers[i], dst=mask)
             
-            # Calculate aspect ratio - cracks are typically elongated
-            aspect_ratio = max(w, h) / (min(w, h) + 1)
+            # Clean up mask with morphological operations
+            cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._morph_kernel, dst=mask)
+            cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self._morph_kernel, dst=mask)
+        return masks
+    
+    def _color_masks_umat(self, hsv: cv2.UMat, defect_types: List[str]) -> np.ndarray:
+        """Same as _color_masks on the OpenCL device; downloads each finished mask."""
+        masks = None
+        for k, defect_type in enumerate(defect_types):
+            i = self._color_index[defect_type]
+            mask = cv2.inRange(hsv, self._color_lowers[i], self._color_uppers[i])
+            mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, self._morph_kernel)
+            mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, self._morph_kernel)
             
-            # Filter for elongated shapes (more likely to be cracks)
-            if aspect_ratio > 2.0:  # Elongated shape
-                # Calculate perimeter for additional filtering
-                perimeter = cv2.arcLength(contour, True)
-                
-                # Cracks have high perimeter-to-area ratio
-                if perimeter > 0 and area / perimeter < 15:
-                    affected_percent = (area / total_pixels) * 100
-                    
-                    # Estimate severity based on size and length
-                    max_dim = max(w, h)
-                    if max_dim > 200:
-                        severity = 'severe'
-                        confidence = 0.85
-                    elif max_dim > 100:
-                        severity = 'moderate'
-                        confidence = 0.75
-                    else:
-                        severity = 'minor'
-                        confidence = 0.65
-                    
-                    defects.append({
-                        'bbox': [x, y, x + w, y + h],
-                        'class': 'crack',
-                        'confidence': confidence,
-                        'severity': severity,
-                        'affected_area_percent': round(affected_percent, 2),
-                        'detection_method': 'cv_edge',
-                    })
+            host = mask.get()
+            if masks is None:
+                masks = np.empty((len(defect_types),) + host.shape, dtype=np.uint8)
+            masks[k] = host
+        return masks
+    
+    def _detect_color_defects(
+        self,
+        hsv: np.ndarray,
+        defect_types: List[str],
+        total_pixels: int,
+        scale: float = 1.0,
+    ) -> List[Dict[str, Any]]:
+        """Detect defects for several color ranges, in defect_types order."""
+        defect_types = [t for t in defect_types if t in self.color_ranges]
+        if not defect_types:
+            return []
         
+        defects = []
+        for mask, defect_type in zip(self._color_masks(hsv, defect_types), defect_types):
+            defects.extend(self._defects_from_mask(mask, defect_type, total_pixels, scale))
         return defects
     
-    def _detect_color_defect(
+    def _defects_from_mask(
         self,
-        hsv: np.ndarray,
-        original: np.ndarray,
+        mask: np.ndarray,
         defect_type: str,
-        total_pixels: int
+        total_pixels: int,
+        scale: float = 1.0,
     ) -> List[Dict[str, Any]]:
-        """Detect defects based on color analysis."""
+        """Turn a color mask into defect detections."""
         defects = []
         
-        color_range = self.color_ranges.get(defect_type)
-        if not color_range:
+        # Find contours
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        if not contours:
             return defects
         
-        # Create mask for the color range
-        mask = cv2.inRange(hsv, color_range['lower'], color_range['upper'])
+        # Filter small detections
+        areas, rects = self._contour_stats(contours, scale)
+        keep = np.flatnonzero(areas >= self.params['min_area'] * 2)
+        if keep.size == 0:
+            return defects
         
-        # Clean up mask with morphological operations
-        kernel = np.ones((5, 5), np.uint8)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+        # Confidence based on area coverage
+        affected = (areas[keep] / total_pixels) * 100
+        severities = np.where(affected > 5, 'severe', np.where(affected > 1, 'moderate', 'minor'))
+        confidences = np.where(affected > 5, 0.9, np.where(affected > 1, 0.8, 0.7))
         
-        # Find contours
-        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        # Map defect type to class name
+        class_name = defect_type.replace('_', ' ').title()
+        if 'mold' in defect_type:
+            class_name = 'Mold'
+        elif 'water' in defect_type:
+            class_name = 'Water Damage'
+        elif 'rust' in defect_type:
+            class_name = 'Rust/Corrosion'
         
-        for contour in contours:
-            area = cv2.contourArea(contour)
-            
-            # Filter small detections
-            if area < self.params['min_area'] * 2:
-                continue
-            
-            x, y, w, h = cv2.boundingRect(contour)
-            affected_percent = (area / total_pixels) * 100
-            
-            # Confidence based on area coverage
-            if affected_percent > 5:
-                confidence = 0.9
-                severity = 'severe'
-            elif affected_percent > 1:
-                confidence = 0.8
-                severity = 'moderate'
-            else:
-                confidence = 0.7
-                severity = 'minor'
-            
-            # Map defect type to class name
-            class_name = defect_type.replace('_', ' ').title()
-            if 'mold' in defect_type:
-                class_name = 'Mold'
-            elif 'water' in defect_type:
-                class_name = 'Water Damage'
-            elif 'rust' in defect_type:
-                class_name = 'Rust/Corrosion'
-            
+        for (x, y, w, h), affected_percent, severity, confidence in zip(
+            rects[keep].tolist(), affected.tolist(), severities.tolist(), confidences.tolist()
+        ):
             defects.append({
                 'bbox': [x, y, x + w, y + h],
                 'class': class_name,
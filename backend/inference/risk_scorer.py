@@ -11,9 +11,11 @@ Features:
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 from dataclasses import dataclass
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
 
@@ -44,6 +46,57 @@ DEFECT_WEIGHTS = {
     'default': DefectWeight(severity=2.0, area_multiplier=1.0, description="Potential issue requiring assessment"),
 }
 
+@dataclass
+class DefectsTable:
+    """
+    Struct-of-arrays view of a defect list for RiskScorer.calculate_score_soa.
+    
+    Missing affected areas are NaN; bboxes that are missing or malformed
+    are NaN rows (scored with the default area factor).
+    """
+    classes: np.ndarray      # (N,) object, lowercase class names
+    confidences: np.ndarray  # (N,) float64
+    bboxes: np.ndarray       # (N, 4) float64 xyxy
+    areas: np.ndarray        # (N,) float64 affected_area_percent
+    
+    def __len__(self) -> int:
+        return len(self.classes)
+    
+    @classmethod
+    def from_defects(cls, defects: List[Dict[str, Any]]) -> "DefectsTable":
+        """Build a table from detection dicts."""
+        bboxes = np.full((len(defects), 4), np.nan)
+        areas = np.full(len(defects), np.nan)
+        for i, defect in enumerate(defects):
+            bbox = defect.get('bbox', [0, 0, 0, 0])
+            if len(bbox) == 4:
+                bboxes[i] = bbox
+            area = defect.get('affected_area_percent', None)
+            if area is not None:
+                areas[i] = area
+        
+        return cls(
+            classes=np.array([d.get('class', 'unknown').lower() for d in defects], dtype=object),
+            confidences=np.array([d.get('confidence', 0.5) for d in defects], dtype=np.float64),
+            bboxes=bboxes,
+            areas=areas,
+        )
+    
+    def to_defects(self) -> List[Dict[str, Any]]:
+        """Detection dicts (class, confidence, bbox, area) for dict-based consumers."""
+        defects = []
+        for defect_class, confidence, bbox, area in zip(
+            self.classes.tolist(), self.confidences.tolist(), self.bboxes.tolist(), self.areas.tolist()
+        ):
+            defect = {'class': defect_class, 'confidence': confidence}
+            if bbox[0] == bbox[0]:  # not NaN
+                defect['bbox'] = bbox
+            if area == area:
+                defect['affected_area_percent'] = area
+            defects.append(defect)
+        return defects
+
+
 # Building age penalty factors
 AGE_FACTORS = {
     'pre_1950': 15.0,
@@ -61,6 +114,45 @@ CLIMATE_FACTORS = {
     'temperate': {},  # No adjustments
 }
 
+# Defect lists at least this long are scored with calculate_score_soa
+# (break-even including the DefectsTable conversion is ~100 defects)
+SOA_MIN_DEFECTS = 128
+
+
+def _build_class_tables() -> Dict[str, Dict[str, tuple]]:
+    """Per climate, defect class -> (DefectWeight, climate multiplier)."""
+    default_weight = DEFECT_WEIGHTS['default']
+    tables = {}
+    for climate, adjustments in CLIMATE_FACTORS.items():
+        classes = list(DEFECT_WEIGHTS) + [c for c in adjustments if c not in DEFECT_WEIGHTS]
+        tables[climate] = {
+            c: (DEFECT_WEIGHTS.get(c, default_weight), adjustments.get(c, 1.0))
+            for c in classes
+        }
+    return tables
+
+
+def _round_array(values: np.ndarray, ndigits: int = 2) -> List[float]:
+    """
+    Python round() for each element, vectorized.
+    
+    np.round() scales in binary, so values whose scaled form lands within
+    float error of .5 can round the other way (e.g. 0.015 -> 0.02 vs
+    round()'s 0.01); those are redone with round().
+    """
+    scale = 10.0 ** ndigits
+    scaled = values * scale
+    rounded = (np.rint(scaled) / scale).tolist()
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+    for i in np.flatnonzero(near_tie).tolist():
+        rounded[i] = round(float(values[i]), ndigits)
+    return rounded
+
+
+# One dict probe per defect instead of separate weight and climate lookups
+CLASS_TABLES = _build_class_tables()
+DEFAULT_CLASS_ENTRY = (DEFECT_WEIGHTS['default'], 1.0)
+
 
 class RiskScorer:
     """
@@ -129,41 +221,39 @@ class RiskScorer:
             Dictionary with score and breakdown
         """
         if not defects:
-            base_result = {
-                'score': 100,
-                'risk_level': 'Low Risk',
-                'defect_count': 0,
-                'breakdown': [],
-                'penalty_breakdown': {
-                    'defects': 0,
-                    'age_factor': 0,
-                    'climate_factor': 0,
-                },
-                'summary': 'No defects detected. Property appears to be in good condition.',
-                'ai_explanation': None,
-                'recommended_actions': ['Continue regular maintenance'],
-            }
-            return base_result
+            return self._empty_result()
+        
+        # Large batches (e.g. the analyze endpoint's local fallback)
+        if len(defects) >= SOA_MIN_DEFECTS:
+            return self.calculate_score_soa(
+                DefectsTable.from_defects(defects), image_area, user_context, defects=defects,
+            )
         
         total_penalty = 0.0
         breakdown = []
         penalty_by_type = {}
         
-        # Get climate adjustments if available
+        # Get climate adjustments if available (unknown climates: none)
         climate = user_context.get('climate', 'temperate') if user_context else 'temperate'
-        climate_adjustments = CLIMATE_FACTORS.get(climate, {})
+        class_table = CLASS_TABLES.get(climate, CLASS_TABLES['temperate'])
         
+        # Loop invariants
+        confidence_weight = self.confidence_weight
+        confidence_offset = 1 - confidence_weight
+        
+        # A single pass: the cost is the dict lookups and building the
+        # breakdown entries, not the arithmetic. A Numba kernel for the
+        # penalties (plus the extra pass to gather its input arrays) measured
+        # 5-40% slower end to end for 3-400 defects; the array path above
+        # is 4.5x slower at 3 defects, 1.3x faster at 400, 1.5x at 1000.
         for defect in defects:
             defect_class = defect.get('class', 'unknown').lower()
             confidence = defect.get('confidence', 0.5)
             bbox = defect.get('bbox', [0, 0, 0, 0])
             affected_area_percent = defect.get('affected_area_percent', None)
             
-            # Get weight for this defect type
-            weight = DEFECT_WEIGHTS.get(defect_class, DEFECT_WEIGHTS['default'])
-            
-            # Apply climate adjustment
-            climate_mult = climate_adjustments.get(defect_class, 1.0)
+            # Get weight for this defect type and its climate adjustment
+            weight, climate_mult = class_table.get(defect_class, DEFAULT_CLASS_ENTRY)
             
             # Calculate defect area
             if affected_area_percent is not None:
@@ -179,7 +269,7 @@ class RiskScorer:
             # Calculate penalty for this defect
             base_penalty = weight.severity * 3.0  # Base penalty per defect
             area_penalty = area_factor * weight.area_multiplier
-            confidence_factor = confidence * self.confidence_weight + (1 - self.confidence_weight)
+            confidence_factor = confidence * confidence_weight + confidence_offset
             
             defect_penalty = (base_penalty + area_penalty) * confidence_factor * climate_mult
             total_penalty += defect_penalty
@@ -196,6 +286,115 @@ class RiskScorer:
                 'climate_adjusted': climate_mult != 1.0,
             })
         
+        return self._finish_score(total_penalty, breakdown, penalty_by_type, defects, user_context)
+    
+    def calculate_score_soa(
+        self,
+        table: DefectsTable,
+        image_area: int = 640 * 480,
+        user_context: Optional[Dict[str, Any]] = None,
+        defects: Optional[List[Dict[str, Any]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Calculate risk score from a struct-of-arrays defect table.
+        
+        Same result as calculate_score(table.to_defects(), ...), with the
+        weight lookups done once per distinct class and the penalties
+        computed as array expressions.
+        
+        Args:
+            table: Defects as parallel arrays
+            image_area: Total image area in pixels
+            user_context: User-provided building information
+            defects: The dicts the table was built from, if any; Cortex is
+                given these so its prompt matches the list path exactly
+            
+        Returns:
+            Dictionary with score and breakdown
+        """
+        if len(table) == 0:
+            return self._empty_result()
+        
+        climate = user_context.get('climate', 'temperate') if user_context else 'temperate'
+        class_table = CLASS_TABLES.get(climate, CLASS_TABLES['temperate'])
+        
+        # Per distinct class, coded in order of first appearance
+        codes: Dict[str, int] = {}
+        inverse = np.fromiter(
+            (codes.setdefault(name, len(codes)) for name in table.classes.tolist()),
+            dtype=np.intp, count=len(table),
+        )
+        names = list(codes)
+        entries = [class_table.get(name, DEFAULT_CLASS_ENTRY) for name in names]
+        weights = [weight for weight, _ in entries]
+        class_climate = [climate_mult for _, climate_mult in entries]
+        
+        severities = np.array([w.severity for w in weights])[inverse]
+        area_mults = np.array([w.area_multiplier for w in weights])[inverse]
+        climate_mults = np.array(class_climate)[inverse]
+        
+        # Area factor: given percent, else bbox estimate, else 1.0
+        bboxes = table.bboxes
+        box_factors = ((bboxes[:, 2] - bboxes[:, 0]) * (bboxes[:, 3] - bboxes[:, 1]) / image_area) * 10.0
+        area_factors = np.where(
+            np.isnan(table.areas),
+            np.where(np.isnan(box_factors), 1.0, box_factors),
+            table.areas / 10.0,
+        )
+        
+        confidence_factors = table.confidences * self.confidence_weight + (1 - self.confidence_weight)
+        penalties = (severities * 3.0 + area_factors * area_mults) * confidence_factors * climate_mults
+        
+        penalty_list = penalties.tolist()
+        total_penalty = sum(penalty_list, 0.0)
+        by_class = np.bincount(inverse, weights=penalties, minlength=len(names)).tolist()
+        penalty_by_type = dict(zip(names, by_class))
+        
+        breakdown = [
+            {
+                'defect_type': names[k],
+                'confidence': confidence,
+                'penalty': penalty,
+                'severity': weights[k].severity,
+                'description': weights[k].description,
+                'climate_adjusted': class_climate[k] != 1.0,
+            }
+            for k, confidence, penalty in zip(
+                inverse.tolist(), _round_array(table.confidences), _round_array(penalties)
+            )
+        ]
+        
+        return self._finish_score(
+            total_penalty, breakdown, penalty_by_type, table if defects is None else defects, user_context,
+        )
+    
+    @staticmethod
+    def _empty_result() -> Dict[str, Any]:
+        """Score result for a frame without defects."""
+        return {
+            'score': 100,
+            'risk_level': 'Low Risk',
+            'defect_count': 0,
+            'breakdown': [],
+            'penalty_breakdown': {
+                'defects': 0,
+                'age_factor': 0,
+                'climate_factor': 0,
+            },
+            'summary': 'No defects detected. Property appears to be in good condition.',
+            'ai_explanation': None,
+            'recommended_actions': ['Continue regular maintenance'],
+        }
+    
+    def _finish_score(
+        self,
+        total_penalty: float,
+        breakdown: List[Dict[str, Any]],
+        penalty_by_type: Dict[str, float],
+        defects: Union[List[Dict[str, Any]], DefectsTable],
+        user_context: Optional[Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """Apply age penalty and cap, then build the score result."""
         # Calculate age penalty if user context provided
         age_penalty = 0.0
         if user_context and 'building_age' in user_context:
@@ -241,6 +440,8 @@ class RiskScorer:
         cortex = self._get_cortex_analytics()
         if cortex:
             try:
+                if isinstance(defects, DefectsTable):
+                    defects = defects.to_defects()
                 cortex_result = cortex.analyze_with_cortex(defects, user_context)
                 ai_explanation = cortex_result.risk_explanation
                 if cortex_result.recommended_actions:
@@ -283,14 +484,20 @@ class RiskScorer:
         if not frame_scores:
             return self.calculate_score([])
         
-        # Use minimum score (worst case) as primary
-        min_score = min(s['score'] for s in frame_scores)
-        avg_score = sum(s['score'] for s in frame_scores) / len(frame_scores)
-        
-        # Collect all unique defects
+        # One pass: minimum score (worst case) as primary, running totals,
+        # and all defects collected
+        min_score = frame_scores[0]['score']
+        total_score = 0
+        total_defects = 0
         all_defects = []
         for fs in frame_scores:
+            score = fs['score']
+            if score < min_score:
+                min_score = score
+            total_score += score
+            total_defects += fs['defect_count']
             all_defects.extend(fs.get('breakdown', []))
+        avg_score = total_score / len(frame_scores)
         
         # Determine overall risk
         if min_score <= 30:
@@ -305,7 +512,7 @@ class RiskScorer:
             'average_score': round(avg_score),
             'risk_level': risk_level,
             'frames_analyzed': len(frame_scores),
-            'total_defects_found': sum(s['defect_count'] for s in frame_scores),
+            'total_defects_found': total_defects,
             'defect_breakdown': all_defects,
         }
 
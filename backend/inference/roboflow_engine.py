@@ -10,14 +10,21 @@ Features:
 - Support for multiple defect types (cracks, mold, water damage)
 """
 
+import asyncio
 import logging
 import os
-import base64
 import httpx
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 import cv2
 
+# HTTP/2 lets concurrent frame uploads share one TLS connection
+try:
+    import h2  # noqa: F401
+    HAS_HTTP2 = True
+except ImportError:
+    HAS_HTTP2 = False
+
 logger = logging.getLogger(__name__)
 
 # Configuration from environment
@@ -25,6 +32,25 @@ ROBOFLOW_API_KEY = os.getenv('ROBOFLOW_API_KEY', '')
 ROBOFLOW_MODEL_ID = os.getenv('ROBOFLOW_MODEL_ID', 'crack-detection-a5fyy/3')
 ROBOFLOW_API_URL = "https://detect.roboflow.com"
 
+# Larger frames are downscaled before upload to the hosted model's native
+# input size (it resizes to this anyway)
+ROBOFLOW_MAX_SIDE = int(os.getenv('ROBOFLOW_MAX_SIDE', 640))
+
+# Pooled connections kept alive between calls
+ROBOFLOW_MAX_CONNECTIONS = int(os.getenv('ROBOFLOW_MAX_CONNECTIONS', 32))
+ROBOFLOW_MAX_KEEPALIVE = int(os.getenv('ROBOFLOW_MAX_KEEPALIVE', 8))
+
+
+# Color scheme for different defect types (BGR)
+DEFECT_COLORS = {
+    'crack': (0, 0, 255),       # Red
+    'mold': (0, 255, 0),        # Green
+    'water_damage': (255, 0, 0), # Blue
+    'leak': (255, 165, 0),      # Orange
+    'corrosion': (128, 0, 128), # Purple
+}
+DEFAULT_DEFECT_COLOR = (0, 255, 255)  # Yellow
+
 
 class RoboflowEngine:
     """
@@ -55,15 +81,51 @@ class RoboflowEngine:
         self.confidence_threshold = confidence_threshold
         self.enabled = bool(self.api_key)
         
+        # Shared client, created on first use so it binds to the serving loop
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_lock = asyncio.Lock()
+        
         if self.enabled:
             logger.info(f"Roboflow engine initialized with model: {self.model_id}")
         else:
             logger.warning("Roboflow API key not configured. Cloud detection disabled.")
     
-    def _encode_image(self, image: np.ndarray) -> str:
-        """Encode image to base64 for API request."""
+    def _encode_image(self, image: np.ndarray) -> Tuple[bytes, float]:
+        """
+        Encode image to JPEG for API request.
+        
+        Returns:
+            (JPEG bytes, scale applied to the image before encoding)
+        """
+        scale = 1.0
+        longest = max(image.shape[:2])
+        if ROBOFLOW_MAX_SIDE > 0 and longest > ROBOFLOW_MAX_SIDE:
+            scale = ROBOFLOW_MAX_SIDE / longest
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        
         _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 85])
-        return base64.b64encode(buffer).decode('utf-8')
+        return buffer.tobytes(), scale
+    
+    async def _get_client(self) -> httpx.AsyncClient:
+        """Get or create the pooled HTTP client."""
+        if self._client is None or self._client.is_closed:
+            async with self._client_lock:
+                if self._client is None or self._client.is_closed:
+                    self._client = httpx.AsyncClient(
+                        timeout=30.0,
+                        limits=httpx.Limits(
+                            max_keepalive_connections=ROBOFLOW_MAX_KEEPALIVE,
+                            max_connections=ROBOFLOW_MAX_CONNECTIONS,
+                        ),
+                        http2=HAS_HTTP2,
+                    )
+        return self._client
+    
+    async def close(self):
+        """Close pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def detect_cracks(
         self,
@@ -86,8 +148,8 @@ class RoboflowEngine:
             }
         
         try:
-            # Encode image
-            image_b64 = self._encode_image(image)
+            # Encode image off the event loop
+            image_bytes, scale = await asyncio.to_thread(self._encode_image, image)
             
             # Call Roboflow API
             url = f"{ROBOFLOW_API_URL}/{self.model_id}"
@@ -96,34 +158,34 @@ class RoboflowEngine:
                 'confidence': int(self.confidence_threshold * 100),
             }
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    url,
-                    params=params,
-                    data=image_b64,
-                    headers={'Content-Type': 'application/x-www-form-urlencoded'}
-                )
-                
-                if response.status_code != 200:
-                    logger.error(f"Roboflow API error: {response.status_code}")
-                    return {
-                        'success': False,
-                        'defects': [],
-                        'error': f'API returned {response.status_code}',
-                    }
-                
-                result = response.json()
+            client = await self._get_client()
+            # Multipart file upload: raw JPEG bytes, no base64 inflation
+            response = await client.post(
+                url,
+                params=params,
+                files={'file': ('frame.jpg', image_bytes, 'image/jpeg')},
+            )
+            
+            if response.status_code != 200:
+                logger.error(f"Roboflow API error: {response.status_code}")
+                return {
+                    'success': False,
+                    'defects': [],
+                    'error': f'API returned {response.status_code}',
+                }
+            
+            result = response.json()
             
             # Parse predictions
             defects = []
             predictions = result.get('predictions', [])
             
             for pred in predictions:
-                # Convert center+size to xyxy format
-                x_center = pred.get('x', 0)
-                y_center = pred.get('y', 0)
-                width = pred.get('width', 0)
-                height = pred.get('height', 0)
+                # Convert center+size to xyxy format, in original image pixels
+                x_center = pred.get('x', 0) / scale
+                y_center = pred.get('y', 0) / scale
+                width = pred.get('width', 0) / scale
+                height = pred.get('height', 0) / scale
                 
                 x1 = int(x_center - width / 2)
                 y1 = int(y_center - height / 2)
@@ -169,10 +231,34 @@ class RoboflowEngine:
                 'error': str(e),
             }
     
+    async def detect_cracks_batch(
+        self,
+        images: List[np.ndarray],
+        concurrency: int = 8,
+    ) -> List[Dict[str, Any]]:
+        """
+        Detect cracks in several images with overlapping API requests.
+        
+        Args:
+            images: BGR images as numpy arrays
+            concurrency: Maximum requests in flight at once
+            
+        Returns:
+            One detect_cracks() result per image, in input order
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        
+        async def detect_one(image: np.ndarray) -> Dict[str, Any]:
+            async with semaphore:
+                return await self.detect_cracks(image)
+        
+        return await asyncio.gather(*(detect_one(image) for image in images))
+    
     def draw_detections(
         self,
         image: np.ndarray,
         defects: List[Dict[str, Any]],
+        out: Optional[np.ndarray] = None,
     ) -> np.ndarray:
         """
         Draw detection boxes on image.
@@ -180,53 +266,50 @@ class RoboflowEngine:
         Args:
             image: Original image
             defects: List of detected defects
+            out: Output buffer (same shape/dtype as image); pass `image`
+                itself to annotate in place. Defaults to a new copy.
             
         Returns:
             Annotated image
         """
-        annotated = image.copy()
+        if out is None:
+            annotated = image.copy()
+        else:
+            annotated = out
+            if out is not image:
+                np.copyto(out, image)
+        if not defects:
+            return annotated
         
-        # Color scheme for different defect types
-        colors = {
-            'crack': (0, 0, 255),       # Red
-            'mold': (0, 255, 0),        # Green
-            'water_damage': (255, 0, 0), # Blue
-            'leak': (255, 165, 0),      # Orange
-            'corrosion': (128, 0, 128), # Purple
-            'default': (0, 255, 255),   # Yellow
-        }
+        # One pass to resolve class, color and bbox per detection
+        class_names = [d.get('class', 'defect').lower() for d in defects]
+        colors = [DEFECT_COLORS.get(name, DEFAULT_DEFECT_COLOR) for name in class_names]
+        bboxes = np.array([d.get('bbox', [0, 0, 0, 0]) for d in defects], dtype=np.int32).reshape(-1, 4)
         
-        for defect in defects:
-            bbox = defect.get('bbox', [0, 0, 0, 0])
-            class_name = defect.get('class', 'defect').lower()
-            confidence = defect.get('confidence', 0)
-            
-            color = colors.get(class_name, colors['default'])
-            
-            # Draw box
-            cv2.rectangle(
-                annotated,
-                (bbox[0], bbox[1]),
-                (bbox[2], bbox[3]),
-                color,
-                2
-            )
-            
-            # Draw label
-            label = f"{class_name}: {confidence:.0%}"
+        # Box outlines: one polylines call per color
+        corners = np.stack([
+            bboxes[:, [0, 1]], bboxes[:, [2, 1]], bboxes[:, [2, 3]], bboxes[:, [0, 3]],
+        ], axis=1)
+        for color in set(colors):
+            outlines = [corners[i] for i, c in enumerate(colors) if c == color]
+            cv2.polylines(annotated, outlines, True, color, 2)
+        
+        # Labels on top of all outlines
+        for defect, class_name, color, (x1, y1, _, _) in zip(defects, class_names, colors, bboxes.tolist()):
+            label = f"{class_name}: {defect.get('confidence', 0):.0%}"
             label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
             
             cv2.rectangle(
                 annotated,
-                (bbox[0], bbox[1] - label_size[1] - 10),
-                (bbox[0] + label_size[0], bbox[1]),
+                (x1, y1 - label_size[1] - 10),
+                (x1 + label_size[0], y1),
                 color,
-                -1
+                cv2.FILLED
             )
             cv2.putText(
                 annotated,
                 label,
-                (bbox[0], bbox[1] - 5),
+                (x1, y1 - 5),
                 cv2.FONT_HERSHEY_SIMPLEX,
                 0.5,
                 (255, 255, 255),
@@ -246,3 +329,9 @@ def get_roboflow_engine() -> RoboflowEngine:
     if _roboflow_instance is None:
         _roboflow_instance = RoboflowEngine()
     return _roboflow_instance
+
+
+async def close_roboflow_engine():
+    """Close the engine's pooled connections, if it was created."""
+    if _roboflow_instance is not None:
+        await _roboflow_instance.close()
@@ -0,0 +1,263 @@
+"""
+Scan Status Store for SafeNest AI
+=================================
+Tracks scan status, progress and final reports between the scan
+endpoints and the background deep-scan tasks.
+
+Backed by Redis when REDIS_URL is set, so records expire on their own and
+several API workers share one view of every scan. Without Redis, records
+live in a process-local dict with the same TTL.
+
+With Redis, the saved-scan history (/api/history) lives there too; without
+it the API keeps history in a local JSON file.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Redis client (optional, falls back to the in-process store)
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+# Redis connection; unset keeps scans in process memory
+REDIS_URL = os.getenv('REDIS_URL', '')
+
+# Scan records expire this long after their last update
+SCAN_TTL_SECONDS = int(os.getenv('SCAN_TTL_SECONDS', 24 * 3600))
+
+_KEY_PREFIX = 'safenest:scan:'
+# Sorted set of processing scan ids, scored by when their record expires
+_PROCESSING_KEY = 'safenest:scans:processing_by_expiry'
+_HISTORY_IDS_KEY = 'safenest:history:ids'
+_HISTORY_ITEMS_KEY = 'safenest:history:items'
+
+
+def _json_default(value: Any) -> Any:
+    """Encode NumPy scalars/arrays that end up in scan results."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class ScanStore:
+    """
+    Scan records keyed by scan id, with a TTL refreshed on every write.
+    
+    Records are plain dicts. Writes go through set()/update() (not by
+    mutating a record returned from get()), so the Redis backend can store
+    each top-level field as its own hash entry.
+    """
+    
+    def __init__(self, redis_url: str = REDIS_URL, ttl_seconds: int = SCAN_TTL_SECONDS):
+        """
+        Args:
+            redis_url: Redis connection URL; empty for the in-process store
+            ttl_seconds: Seconds a record lives after its last write
+        """
+        self.ttl = ttl_seconds
+        self._redis = None
+        
+        # In-process fallback: scan_id -> (expires_at, record), oldest first
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        if redis_url and HAS_REDIS:
+            try:
+                client = redis.Redis.from_url(redis_url, socket_timeout=2, decode_responses=True)
+                client.ping()
+                self._redis = client
+                logger.info("Scan store backed by Redis")
+            except Exception as e:
+                logger.warning(f"Redis unavailable, keeping scans in memory: {e}")
+        elif redis_url:
+            logger.warning("REDIS_URL set but redis is not installed, keeping scans in memory")
+    
+    def __contains__(self, scan_id: str) -> bool:
+        if self._redis is not None:
+            return bool(self._redis.exists(_KEY_PREFIX + scan_id))
+        with self._lock:
+            self._evict()
+            return scan_id in self._local
+    
+    def get(self, scan_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Return a snapshot of a scan record.
+        
+        Args:
+            scan_id: Scan identifier
+        
+        Returns:
+            Record dict, or None if unknown or expired
+        """
+        if self._redis is not None:
+            fields = self._redis.hgetall(_KEY_PREFIX + scan_id)
+            if not fields:
+                return None
+            return {name: json.loads(value) for name, value in fields.items()}
+        
+        with self._lock:
+            self._evict()
+            entry = self._local.get(scan_id)
+            return dict(entry[1]) if entry else None
+    
+    def set(self, scan_id: str, record: Dict[str, Any]):
+        """Replace a scan record."""
+        self._write(scan_id, record, replace=True)
+    
+    def update(self, scan_id: str, fields: Dict[str, Any]):
+        """Merge fields into a scan record (creating it if needed)."""
+        self._write(scan_id, fields, replace=False)
+    
+    def count_processing(self) -> int:
+        """Number of scans currently in the 'processing' state."""
+        if self._redis is not None:
+            # Ids whose record expired without a final status update are dropped
+            pipe = self._redis.pipeline()
+            pipe.zremrangebyscore(_PROCESSING_KEY, '-inf', time.time())
+            pipe.zcard(_PROCESSING_KEY)
+            return pipe.execute()[1]
+        with self._lock:
+            self._evict()
+            return sum(1 for _, record in self._local.values() if record.get('status') == 'processing')
+    
+    def _write(self, scan_id: str, fields: Dict[str, Any], replace: bool):
+        """Store fields and refresh the record's TTL."""
+        if self._redis is not None:
+            key = _KEY_PREFIX + scan_id
+            pipe = self._redis.pipeline()
+            if replace:
+                pipe.delete(key)
+            if fields:
+                pipe.hset(key, mapping={
+                    name: json.dumps(value, default=_json_default) for name, value in fields.items()
+                })
+            pipe.expire(key, self.ttl)
+            expires_at = time.time() + self.ttl
+            if fields.get('status') == 'processing':
+                pipe.zadd(_PROCESSING_KEY, {scan_id: expires_at})
+            elif replace or 'status' in fields:
+                pipe.zrem(_PROCESSING_KEY, scan_id)
+            else:
+                # Progress updates extend a processing scan's entry with its TTL
+                pipe.zadd(_PROCESSING_KEY, {scan_id: expires_at}, xx=True)
+            pipe.execute()
+            return
+        
+        with self._lock:
+            entry = self._local.pop(scan_id, None)
+            record = {} if replace or entry is None else entry[1]
+            record.update(fields)
+            self._local[scan_id] = (time.monotonic() + self.ttl, record)
+            self._evict()
+    
+    def _evict(self):
+        """Drop expired in-process records (oldest write first). Caller holds the lock."""
+        now = time.monotonic()
+        while self._local:
+            scan_id, (expires_at, _) = next(iter(self._local.items()))
+            if expires_at > now:
+                break
+            del self._local[scan_id]
+
+
+class ScanHistory:
+    """
+    Newest-first saved-scan history in Redis, shared by all API workers.
+    
+    Scan ids are kept in a list (order and cap) and items in a hash keyed
+    by id, so saving, capping and deleting never rewrite the whole history.
+    """
+    
+    def __init__(self, client, max_items: int = 100):
+        """
+        Args:
+            client: Connected redis.Redis client (decode_responses=True)
+            max_items: Items kept; older ones are dropped on save
+        """
+        self._redis = client
+        self.max_items = max_items
+    
+    def items(self) -> List[Dict[str, Any]]:
+        """All history items, newest first."""
+        ids = self._redis.lrange(_HISTORY_IDS_KEY, 0, -1)
+        if not ids:
+            return []
+        values = self._redis.hmget(_HISTORY_ITEMS_KEY, ids)
+        return [json.loads(value) for value in values if value is not None]
+    
+    def save(self, item: Dict[str, Any]):
+        """Add an item at the front, replacing any earlier copy."""
+        scan_id = str(item.get('id'))
+        value = json.dumps(item, default=_json_default)
+        
+        # Trim and drop the trimmed items in one transaction; WATCH retries
+        # if another save changes the id list first
+        with self._redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(_HISTORY_IDS_KEY)
+                    ids = [i for i in pipe.lrange(_HISTORY_IDS_KEY, 0, -1) if i != scan_id]
+                    dropped = ids[self.max_items - 1:]
+                    
+                    pipe.multi()
+                    pipe.lrem(_HISTORY_IDS_KEY, 0, scan_id)
+                    pipe.lpush(_HISTORY_IDS_KEY, scan_id)
+                    pipe.hset(_HISTORY_ITEMS_KEY, scan_id, value)
+                    pipe.ltrim(_HISTORY_IDS_KEY, 0, self.max_items - 1)
+                    if dropped:
+                        pipe.hdel(_HISTORY_ITEMS_KEY, *dropped)
+                    pipe.execute()
+                    return
+                except redis.WatchError:
+                    continue
+    
+    def delete(self, scan_id: str) -> bool:
+        """
+        Remove an item.
+        
+        Returns:
+            True if the scan was in the history
+        """
+        pipe = self._redis.pipeline()
+        pipe.lrem(_HISTORY_IDS_KEY, 0, scan_id)
+        pipe.hdel(_HISTORY_ITEMS_KEY, scan_id)
+        removed, _ = pipe.execute()
+        return removed > 0
+
+
+# Global instances
+_scan_store: Optional[ScanStore] = None
+_scan_history: Optional[ScanHistory] = None
+
+
+def get_scan_store() -> ScanStore:
+    """Get or create the scan store instance."""
+    global _scan_store
+    if _scan_store is None:
+        _scan_store = ScanStore()
+    return _scan_store
+
+
+def get_redis_history() -> Optional[ScanHistory]:
+    """Get the Redis scan history, or None when the scan store has no Redis."""
+    global _scan_history
+    if _scan_history is None:
+        client = get_scan_store()._redis
+        if client is None:
+            return None
+        _scan_history = ScanHistory(client)
+    return _scan_history
@@ -11,10 +11,19 @@ Features:
 - AI-powered risk scoring with natural language explanations
 """
 
+import atexit
+import csv
+import hashlib
+import io
 import logging
 import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
 from datetime import datetime
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 import json
 
@@ -36,6 +45,29 @@ SNOWFLAKE_DATABASE = os.getenv('SNOWFLAKE_DATABASE', 'SAFENEST_AI')
 SNOWFLAKE_SCHEMA = os.getenv('SNOWFLAKE_SCHEMA', 'INSPECTIONS')
 SNOWFLAKE_WAREHOUSE = os.getenv('SNOWFLAKE_WAREHOUSE', 'COMPUTE_WH')
 
+# Scans with more detections than this are bulk-loaded via stage + COPY INTO
+SNOWFLAKE_STAGE = 'SAFENEST_SCAN_STAGE'
+SNOWFLAKE_STAGE_MIN_ROWS = int(os.getenv('SNOWFLAKE_STAGE_MIN_ROWS', '20'))
+
+# Session keep-alive heartbeat (seconds, Snowflake allows 900-3600)
+SNOWFLAKE_HEARTBEAT_SECONDS = int(os.getenv('SNOWFLAKE_HEARTBEAT_SECONDS', '900'))
+
+# Background scan writer: max queued scans, and scans/latency per transaction
+SNOWFLAKE_WRITE_QUEUE_SIZE = int(os.getenv('SNOWFLAKE_WRITE_QUEUE_SIZE', '256'))
+SNOWFLAKE_WRITE_BATCH = 16
+SNOWFLAKE_WRITE_LINGER_S = 0.5
+
+# Deadline for Cortex COMPLETE/SUMMARIZE before falling back to local results
+CORTEX_TIMEOUT_SECONDS = float(os.getenv('CORTEX_TIMEOUT_SECONDS', '20'))
+
+# Cortex response cache (entries, seconds); size 0 disables caching
+CORTEX_CACHE_SIZE = int(os.getenv('CORTEX_CACHE_SIZE', '512'))
+CORTEX_CACHE_TTL = float(os.getenv('CORTEX_CACHE_TTL', '3600'))
+
+# Defect classes driving the local severity assessment
+CRITICAL_TYPES = frozenset({'mold', 'water_damage', 'leak', 'structural'})
+HIGH_TYPES = frozenset({'crack', 'rust', 'corrosion', 'dampness'})
+
 
 @dataclass
 class CortexAnalysisResult:
@@ -66,6 +98,17 @@ class SnowflakeCortexAnalytics:
     def __init__(self):
         """Initialize Snowflake Cortex analytics."""
         self.session = None
+        
+        # Scan writes run in their own session (opened by the writer
+        # thread), so their transactions never include request queries
+        self._connection_params: Dict[str, Any] = {}
+        self._writer_session = None
+        
+        # LRU + TTL cache of Cortex responses keyed by prompt hash
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_stats = {'hits': 0, 'misses': 0}
+        
         # Read config at runtime to ensure env vars are loaded
         self.enabled = os.getenv('SNOWFLAKE_ENABLED', 'false').lower() == 'true'
         
@@ -84,6 +127,16 @@ class SnowflakeCortexAnalytics:
             except Exception as e:
                 logger.warning(f"Snowflake connection failed: {e}. Using local fallback.")
                 self.enabled = False
+            
+            if self.enabled:
+                # Scan storage is queued and written by a daemon thread, which
+                # batches several scans into one transaction
+                self._write_q: "queue.Queue[Tuple[tuple, List[tuple]]]" = queue.Queue(maxsize=SNOWFLAKE_WRITE_QUEUE_SIZE)
+                self._writer_thread = threading.Thread(
+                    target=self._writer_loop, name='snowflake-writer', daemon=True
+                )
+                self._writer_thread.start()
+                atexit.register(self.flush)
         else:
             logger.info("Snowflake not configured. Using local analytics fallback.")
     
@@ -92,16 +145,20 @@ class SnowflakeCortexAnalytics:
         try:
             from snowflake.snowpark import Session
             
-            connection_params = {
+            self._connection_params = {
                 'account': self.account,
                 'user': self.user,
                 'password': self.password,
                 'database': self.database,
                 'schema': self.schema,
                 'warehouse': self.warehouse,
+                # Keep the session (and its pooled HTTPS connections) alive
+                # between scans instead of re-authenticating after idle periods
+                'client_session_keep_alive': True,
+                'client_session_keep_alive_heartbeat_frequency': SNOWFLAKE_HEARTBEAT_SECONDS,
             }
             
-            self.session = Session.builder.configs(connection_params).create()
+            self.session = Session.builder.configs(self._connection_params).create()
             logger.info(f"Connected to Snowflake: {self.account}")
             
             # Ensure tables exist (best effort)
@@ -149,6 +206,9 @@ class SnowflakeCortexAnalytics:
             )
         """).collect()
         
+        # Internal stage for bulk detection loads
+        self.session.sql(f"CREATE STAGE IF NOT EXISTS {SNOWFLAKE_STAGE}").collect()
+        
         logger.info("Snowflake tables initialized")
     
     def analyze_with_cortex(
@@ -205,41 +265,132 @@ class SnowflakeCortexAnalytics:
         }}
         """
         
+        anomaly = self._check_anomaly(defects)
+        cache_key = self._cache_key('complete', prompt)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return self._parse_cortex_response(cached, anomaly)
+        
         try:
-            result = self.session.sql(f"""
-                SELECT snowflake.cortex.complete(
-                    'mistral-large2',
-                    '{prompt.replace("'", "''")}'
-                ) as response
-            """).collect()
+            # Submit without blocking; the rule-based result is computed while
+            # Cortex runs and doubles as the fallback if it misses the deadline.
+            # Not fused with SUMMARIZE/trend stats into one query: those are
+            # requested by separate endpoints, never alongside this call
+            job = self.session.sql(
+                "SELECT snowflake.cortex.complete(?, ?) as response",
+                params=['mistral-large2', prompt],
+            ).collect_nowait()
+        except Exception as e:
+            logger.error(f"Cortex analysis failed: {e}")
+            return self._local_analysis(defects, user_context, building_profile)
+        
+        local_result = self._local_analysis(defects, user_context, building_profile)
+        
+        try:
+            result = self._await_job(job, CORTEX_TIMEOUT_SECONDS)
+            if result is None:
+                logger.warning(f"Cortex analysis exceeded {CORTEX_TIMEOUT_SECONDS}s, using local analysis")
+                return local_result
             
             response_text = result[0]['RESPONSE']
-            parsed = json.loads(response_text)
-            
-            return CortexAnalysisResult(
-                risk_explanation=parsed.get('risk_explanation', ''),
-                severity_assessment=parsed.get('severity_assessment', 'Unknown'),
-                recommended_actions=parsed.get('recommended_actions', []),
-                confidence_score=parsed.get('confidence_score', 0.5),
-                anomaly_detected=self._check_anomaly(defects),
-            )
+            analysis = self._parse_cortex_response(response_text, anomaly)
+            # Only well-formed responses are cached
+            self._cache_put(cache_key, response_text)
+            return analysis
             
         except Exception as e:
             logger.error(f"Cortex analysis failed: {e}")
-            return self._local_analysis(defects, user_context, building_profile)
+            return local_result
+    
+    @staticmethod
+    def _parse_cortex_response(response_text: str, anomaly: bool) -> CortexAnalysisResult:
+        """Build a CortexAnalysisResult from the COMPLETE JSON response."""
+        parsed = json.loads(response_text)
+        
+        return CortexAnalysisResult(
+            risk_explanation=parsed.get('risk_explanation', ''),
+            severity_assessment=parsed.get('severity_assessment', 'Unknown'),
+            recommended_actions=parsed.get('recommended_actions', []),
+            confidence_score=parsed.get('confidence_score', 0.5),
+            anomaly_detected=anomaly,
+        )
+    
+    @staticmethod
+    def _cache_key(function: str, text: str) -> str:
+        """Key a Cortex response by function name and exact prompt text."""
+        return hashlib.sha256(f"{function}\0{text}".encode('utf-8')).hexdigest()
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        """
+        Look up a cached Cortex response.
+        
+        Args:
+            key: Key from _cache_key
+            
+        Returns:
+            Response text, or None on a miss or expired entry
+        """
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None and time.monotonic() - entry[0] < CORTEX_CACHE_TTL:
+                self._cache.move_to_end(key)
+                self.cache_stats['hits'] += 1
+                return entry[1]
+            if entry is not None:
+                del self._cache[key]
+            self.cache_stats['misses'] += 1
+            return None
+    
+    def _cache_put(self, key: str, response_text: str):
+        """Store a Cortex response, evicting least recently used entries."""
+        if CORTEX_CACHE_SIZE <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), response_text)
+            self._cache.move_to_end(key)
+            while len(self._cache) > CORTEX_CACHE_SIZE:
+                self._cache.popitem(last=False)
+    
+    @staticmethod
+    def _await_job(job, timeout: float):
+        """
+        Wait for a Snowpark AsyncJob with a deadline.
+        
+        Args:
+            job: AsyncJob returned by collect_nowait()
+            timeout: Seconds to wait before cancelling the query
+            
+        Returns:
+            Result rows, or None if the deadline passed (query is cancelled)
+        """
+        deadline = time.monotonic() + timeout
+        delay = 0.01
+        while not job.is_done():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                try:
+                    job.cancel()
+                except Exception:
+                    pass
+                return None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 0.25)
+        return job.result()
     
     def _check_anomaly(self, defects: List[Dict[str, Any]]) -> bool:
         """Use Cortex anomaly detection to identify unusual patterns."""
         if not self.session or len(defects) < 3:
             return False
         
+        # Anomaly: many defects, or unusually high confidence. The count test
+        # goes first so the confidence mean is only taken over 3-10 defects
+        if len(defects) > 10:
+            return True
+        
         try:
             # Check if defect pattern is anomalous compared to historical data
-            confidence_values = [d.get('confidence', 0) for d in defects]
-            avg_confidence = sum(confidence_values) / len(confidence_values)
-            
-            # Anomaly: unusually high confidence or many defects
-            return avg_confidence > 0.85 or len(defects) > 10
+            avg_confidence = sum([d.get('confidence', 0) for d in defects]) / len(defects)
+            return avg_confidence > 0.85
             
         except Exception:
             return False
@@ -263,31 +414,27 @@ class SnowflakeCortexAnalytics:
                 anomaly_detected=False,
             )
         
-        # Analyze defect types
-        defect_types = [d.get('class', 'unknown').lower() for d in defects]
+        # Analyze defect types (folded into a set once)
+        defect_types = {d.get('class', 'unknown').lower() for d in defects}
         confidences = [d.get('confidence', 0.5) for d in defects]
         
         avg_confidence = sum(confidences) / len(confidences)
         max_confidence = max(confidences)
         
         # Determine severity based on defect types
-        critical_types = {'mold', 'water_damage', 'leak', 'structural'}
-        high_types = {'crack', 'rust', 'corrosion', 'dampness'}
-        
-        has_critical = any(t in defect_types for t in critical_types)
-        has_high = any(t in defect_types for t in high_types)
+        critical_hits = defect_types & CRITICAL_TYPES
         
-        if has_critical:
+        if critical_hits:
             severity = "Critical"
-            explanation = f"Critical issues detected including {', '.join(set(defect_types) & critical_types)}. "
+            explanation = f"Critical issues detected including {', '.join(critical_hits)}. "
             actions = [
                 "Schedule immediate professional inspection",
                 "Document all affected areas with photos",
                 "Consider temporary mitigation measures",
             ]
-        elif has_high:
+        elif not defect_types.isdisjoint(HIGH_TYPES):
             severity = "High"
-            explanation = f"Significant defects detected: {', '.join(set(defect_types))}. "
+            explanation = f"Significant defects detected: {', '.join(defect_types)}. "
             actions = [
                 "Schedule professional assessment within 2 weeks",
                 "Monitor affected areas for changes",
@@ -303,7 +450,7 @@ class SnowflakeCortexAnalytics:
             ]
         else:
             severity = "Low"
-            explanation = f"Minor issues detected: {', '.join(set(defect_types))}. "
+            explanation = f"Minor issues detected: {', '.join(defect_types)}. "
             actions = [
                 "Include in regular maintenance schedule",
                 "Monitor for deterioration",
@@ -324,17 +471,41 @@ class SnowflakeCortexAnalytics:
             anomaly_detected=len(defects) > 10 or max_confidence > 0.9,
         )
     
+    @staticmethod
+    def _canonicalize(defects: List[Dict[str, Any]]) -> List[Tuple[str, float, int]]:
+        """
+        Reduce defects to a stable, bucketed form for prompting.
+        
+        Confidence is bucketed to 5% and area to whole percent, and the list
+        is ordered by (confidence desc, class, area desc), so logically equal
+        scans produce the same prompt text and hit the response cache.
+        
+        Args:
+            defects: List of detected defects
+            
+        Returns:
+            Sorted (class, confidence, area_percent) tuples
+        """
+        canonical = [
+            (
+                str(d.get('class', 'unknown')),
+                round(d.get('confidence', 0) * 20) / 20,
+                round(d.get('affected_area_percent', 0)),
+            )
+            for d in defects
+        ]
+        canonical.sort(key=lambda c: (-c[1], c[0], -c[2]))
+        return canonical
+    
     def _format_defects_for_llm(self, defects: List[Dict[str, Any]]) -> str:
-        """Format defects for LLM prompt."""
+        """Format defects for LLM prompt (canonicalized, see _canonicalize)."""
         if not defects:
             return "No defects detected."
         
         lines = []
-        for i, d in enumerate(defects[:10], 1):  # Limit to 10 for prompt size
-            defect_class = d.get('class', 'unknown')
-            confidence = d.get('confidence', 0)
-            area = d.get('affected_area_percent', 0)
-            lines.append(f"{i}. {defect_class} (confidence: {confidence:.0%}, area: {area:.1f}%)")
+        canonical = self._canonicalize(defects)
+        for i, (defect_class, confidence, area) in enumerate(canonical[:10], 1):  # Limit to 10 for prompt size
+            lines.append(f"{i}. {defect_class} (confidence: {confidence:.0%}, area: {area}%)")
         
         if len(defects) > 10:
             lines.append(f"... and {len(defects) - 10} more defects")
@@ -376,7 +547,10 @@ class SnowflakeCortexAnalytics:
         processing_time: float = 0,
     ):
         """
-        Store scan results to Snowflake for analytics.
+        Queue scan results for storage to Snowflake analytics.
+        
+        Returns immediately; the writer thread stores the scan. Scans are
+        dropped (with an error log) if the write queue is full.
         
         Args:
             scan_id: Scan identifier
@@ -391,54 +565,177 @@ class SnowflakeCortexAnalytics:
             logger.debug("Snowflake not enabled, skipping storage")
             return
         
+        # Scan row in SCAN_RESULTS bind order. The context travels as one bound
+        # JSON string: create_dataframe() with a VariantType column json-encodes
+        # it anyway and would add a temp-table round trip, so PARSE_JSON stays
+        context_json = json.dumps(user_context) if user_context else '{}'
+        scan_row = (
+            scan_id,
+            scan_type,
+            risk_score,
+            risk_level,
+            len(defects),
+            context_json,
+            processing_time,
+        )
+        
+        rows = []
+        for det in defects:
+            bbox = det.get('bbox', [0, 0, 0, 0])
+            bbox_area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1]) if len(bbox) == 4 else 0
+            rows.append((
+                str(uuid.uuid4()),
+                scan_id,
+                det.get('class', 'unknown'),
+                det.get('confidence', 0),
+                bbox_area,
+                det.get('affected_area_percent', 0),
+                det.get('detection_method', 'yolo'),
+            ))
+        
+        try:
+            self._write_q.put_nowait((scan_row, rows))
+        except queue.Full:
+            logger.error(f"Snowflake write queue full, dropping scan {scan_id}")
+    
+    def _writer_loop(self):
+        """Drain the scan queue, storing each batch of scans in one transaction."""
+        while True:
+            batch = [self._write_q.get()]
+            deadline = time.monotonic() + SNOWFLAKE_WRITE_LINGER_S
+            while len(batch) < SNOWFLAKE_WRITE_BATCH:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._write_q.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            try:
+                self._write_batch(batch)
+            finally:
+                for _ in batch:
+                    self._write_q.task_done()
+    
+    def _get_writer_session(self):
+        """Writer thread's session, opened on first use."""
+        if self._writer_session is None:
+            from snowflake.snowpark import Session
+            self._writer_session = Session.builder.configs(self._connection_params).create()
+        return self._writer_session
+    
+    def _write_batch(self, batch: List[Tuple[tuple, List[tuple]]]):
+        """
+        Store queued scans and their detections.
+        
+        All scan rows go out in one INSERT and all detections in one bulk
+        statement (or stage load), inside a single transaction on the
+        writer's own session.
+        
+        Args:
+            batch: (scan_row, detection_rows) tuples from store_scan_result
+        """
+        scan_rows = [scan_row for scan_row, _ in batch]
+        rows = [row for _, detection_rows in batch for row in detection_rows]
+        
+        try:
+            session = self._get_writer_session()
+        except Exception as e:
+            logger.error(f"Failed to open Snowflake writer session, dropping {len(scan_rows)} scan(s): {e}")
+            return
+        
         try:
-            # Insert scan result
-            context_json = json.dumps(user_context) if user_context else '{}'
+            # Scan rows and their detections land together or not at all
+            session.sql("BEGIN").collect()
             
-            self.session.sql(f"""
+            # PARSE_JSON is not allowed inside VALUES, so select from it
+            values = ', '.join(['(?, ?, ?, ?, ?, ?, ?)'] * len(scan_rows))
+            session.sql(f"""
                 INSERT INTO SCAN_RESULTS 
                 (scan_id, scan_type, timestamp, risk_score, risk_level, 
                  defect_count, persons_blurred, user_context, processing_time_seconds)
-                VALUES (
-                    '{scan_id}',
-                    '{scan_type}',
-                    CURRENT_TIMESTAMP(),
-                    {risk_score},
-                    '{risk_level}',
-                    {len(defects)},
-                    0,
-                    PARSE_JSON('{context_json.replace("'", "''")}'),
-                    {processing_time}
-                )
-            """).collect()
+                SELECT column1, column2, CURRENT_TIMESTAMP(), column3, column4,
+                       column5, 0, PARSE_JSON(column6), column7
+                FROM VALUES {values}
+            """, params=[value for row in scan_rows for value in row]).collect()
             
-            # Insert individual detections
-            for det in defects:
-                import uuid
-                det_id = str(uuid.uuid4())
-                bbox = det.get('bbox', [0, 0, 0, 0])
-                bbox_area = (bbox[2] - bbox[0]) * (bbox[3] - bbox[1]) if len(bbox) == 4 else 0
-                
-                self.session.sql(f"""
-                    INSERT INTO SCAN_DETECTIONS
-                    (detection_id, scan_id, timestamp, defect_class, confidence,
-                     bbox_area, affected_area_percent, detection_method)
-                    VALUES (
-                        '{det_id}',
-                        '{scan_id}',
-                        CURRENT_TIMESTAMP(),
-                        '{det.get('class', 'unknown')}',
-                        {det.get('confidence', 0)},
-                        {bbox_area},
-                        {det.get('affected_area_percent', 0)},
-                        '{det.get('detection_method', 'yolo')}'
-                    )
-                """).collect()
+            # Insert detections: one bulk statement, or a stage load for big batches
+            if rows:
+                if len(rows) > SNOWFLAKE_STAGE_MIN_ROWS:
+                    try:
+                        self._copy_detections(session, str(uuid.uuid4()), rows)
+                    except Exception as e:
+                        logger.warning(f"Stage load failed, falling back to INSERT: {e}")
+                        self._insert_detections(session, rows)
+                else:
+                    self._insert_detections(session, rows)
+            
+            session.sql("COMMIT").collect()
             
-            logger.info(f"Stored scan {scan_id} to Snowflake with {len(defects)} detections")
+            logger.info(f"Stored {len(scan_rows)} scan(s) to Snowflake with {len(rows)} detections")
             
         except Exception as e:
-            logger.error(f"Failed to store scan to Snowflake: {e}")
+            logger.error(f"Failed to store scans to Snowflake: {e}")
+            try:
+                session.sql("ROLLBACK").collect()
+            except Exception:
+                pass
+    
+    def flush(self):
+        """Block until all queued scans are written."""
+        if self.enabled and self.session:
+            self._write_q.join()
+    
+    def _insert_detections(self, session, rows: List[tuple]):
+        """Insert detection rows with a single multi-row bound INSERT."""
+        params = [value for row in rows for value in row]
+        values = ', '.join(['(?, ?, CURRENT_TIMESTAMP(), ?, ?, ?, ?, ?)'] * len(rows))
+        
+        session.sql(f"""
+            INSERT INTO SCAN_DETECTIONS
+            (detection_id, scan_id, timestamp, defect_class, confidence,
+             bbox_area, affected_area_percent, detection_method)
+            VALUES {values}
+        """, params=params).collect()
+    
+    def _copy_detections(self, session, load_id: str, rows: List[tuple]):
+        """
+        Bulk-load detection rows through the internal stage.
+        
+        Rows are written as CSV to an in-memory buffer, PUT (gzip) to
+        SAFENEST_SCAN_STAGE and loaded with COPY INTO; the staged file is
+        purged once loaded.
+        
+        Args:
+            session: Session the load runs in (the writer's)
+            load_id: Unique id naming the staged file
+            rows: Detection tuples in _insert_detections column order
+        """
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        payload = io.BytesIO(buffer.getvalue().encode('utf-8'))
+        
+        file_name = f"detections_{load_id}.csv"
+        session.file.put_stream(
+            payload,
+            f"@{SNOWFLAKE_STAGE}/{file_name}",
+            auto_compress=True,
+            overwrite=True,
+        )
+        
+        session.sql(f"""
+            COPY INTO SCAN_DETECTIONS
+            (detection_id, scan_id, timestamp, defect_class, confidence,
+             bbox_area, affected_area_percent, detection_method)
+            FROM (
+                SELECT $1, $2, CURRENT_TIMESTAMP(), $3, $4, $5, $6, $7
+                FROM @{SNOWFLAKE_STAGE}
+            )
+            FILES = ('{file_name}.gz')
+            FILE_FORMAT = (TYPE = CSV FIELD_OPTIONALLY_ENCLOSED_BY = '"')
+            PURGE = TRUE
+        """).collect()
     
     def get_trend_analysis(
         self,
@@ -457,16 +754,18 @@ class SnowflakeCortexAnalytics:
             }
         
         try:
-            # Get aggregated stats
-            result = self.session.sql(f"""
+            # Get aggregated stats. The aggregation runs server-side and returns
+            # a single row, so collect() is right here; Arrow batch streaming
+            # only pays off for row-level result sets
+            result = self.session.sql("""
                 SELECT 
                     COUNT(*) as total_scans,
                     AVG(risk_score) as avg_risk_score,
                     SUM(defect_count) as total_defects,
                     COUNT(DISTINCT scan_id) as unique_properties
                 FROM SCAN_RESULTS
-                WHERE timestamp > DATEADD(day, -{days}, CURRENT_TIMESTAMP())
-            """).collect()
+                WHERE timestamp > DATEADD(day, -?, CURRENT_TIMESTAMP())
+            """, params=[int(days)]).collect()
             
             if result:
                 row = result[0]
@@ -498,16 +797,27 @@ class SnowflakeCortexAnalytics:
         if self.enabled and self.session:
             try:
                 defect_text = self._format_defects_for_llm(defects)
+                cache_key = self._cache_key('summarize', f"{defect_text}\0{risk_score}")
+                cached = self._cache_get(cache_key)
+                if cached is not None:
+                    return cached
                 
-                result = self.session.sql(f"""
-                    SELECT snowflake.cortex.summarize(
-                        'Property inspection found the following issues: {defect_text}. 
-                        Overall risk score: {risk_score}/100.',
-                        {{'max_words': 50}}
-                    ) as summary
-                """).collect()
+                # Bound, like the COMPLETE prompt: defect text is not SQL-escaped
+                text = (
+                    f"Property inspection found the following issues: {defect_text}. "
+                    f"Overall risk score: {risk_score}/100."
+                )
+                job = self.session.sql(
+                    "SELECT snowflake.cortex.summarize(?) as summary",
+                    params=[text],
+                ).collect_nowait()
                 
-                return result[0]['SUMMARY']
+                result = self._await_job(job, CORTEX_TIMEOUT_SECONDS)
+                if result is not None:
+                    summary = result[0]['SUMMARY']
+                    self._cache_put(cache_key, summary)
+                    return summary
+                logger.warning(f"Cortex summarize exceeded {CORTEX_TIMEOUT_SECONDS}s, using template summary")
                 
             except Exception as e:
                 logger.warning(f"Cortex summarize failed: {e}")
@@ -522,11 +832,15 @@ class SnowflakeCortexAnalytics:
 
 # Singleton instance
 _analytics_instance: Optional[SnowflakeCortexAnalytics] = None
+_analytics_lock = threading.Lock()
 
 
 def get_snowflake_analytics() -> SnowflakeCortexAnalytics:
-    """Get or create Snowflake Cortex analytics instance."""
+    """Get or create the process-wide Snowflake Cortex analytics instance."""
     global _analytics_instance
     if _analytics_instance is None:
-        _analytics_instance = SnowflakeCortexAnalytics()
+        # Concurrent first calls (worker threads) must not open two sessions
+        with _analytics_lock:
+            if _analytics_instance is None:
+                _analytics_instance = SnowflakeCortexAnalytics()
     return _analytics_instance
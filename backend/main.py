@@ -18,21 +18,49 @@ import asyncio
 import logging
 import base64
 import json
+import os
+import queue
+import threading
+import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Hashable
 from dataclasses import dataclass, asdict
 import tempfile
 import shutil
 
 import numpy as np
 import cv2
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, UploadFile, File, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel
 import uvicorn
 
+# Fast JSON for WebSocket messages (optional, falls back to stdlib json)
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+# libjpeg-turbo bindings for frame decode/encode (optional, falls back to OpenCV)
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR
+    HAS_TURBOJPEG = True
+except ImportError:
+    HAS_TURBOJPEG = False
+
+# Advisory file locks for the shared history file (POSIX only)
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -56,15 +84,57 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# In-memory scan storage (use Redis/DB in production)
-scan_storage: Dict[str, Dict[str, Any]] = {}
+# Response compression: bodies smaller than GZIP_MIN_SIZE bytes go out
+# as-is. Level 1 compresses evidence JSON about as well as 9 (base64
+# thumbnails barely shrink at any level) for the least event-loop time.
+GZIP_MIN_SIZE = int(os.getenv('GZIP_MIN_SIZE', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 1))
+
+
+class JSONGZipMiddleware(GZipMiddleware):
+    """GZip responses except evidence JPEGs, which are already compressed."""
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].endswith("/image"):
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app.add_middleware(JSONGZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_LEVEL)
+
+# Quick Scan: run full analysis on every Nth frame; frames in between reuse
+# the last result (browser capture at 30 FPS makes neighbours near-identical)
+QUICK_SCAN_FRAME_STRIDE = max(1, int(os.getenv('QUICK_SCAN_FRAME_STRIDE', 3)))
 
-# Lazy-loaded inference engines
+# Quick Scan annotated frames: max width sent back (0 keeps full size) and
+# JPEG quality
+ANNOTATED_FRAME_MAX_WIDTH = int(os.getenv('ANNOTATED_FRAME_MAX_WIDTH', 640))
+ANNOTATED_FRAME_JPEG_QUALITY = int(os.getenv('ANNOTATED_FRAME_JPEG_QUALITY', 80))
+
+# Short-TTL cache for idempotent GET responses; RESPONSE_CACHE=0 disables
+RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE', '1') != '0'
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 256))
+
+# Deep Scan recordings: max frames buffered for the video writer thread
+DEEP_SCAN_VIDEO_QUEUE_SIZE = int(os.getenv('DEEP_SCAN_VIDEO_QUEUE_SIZE', 64))
+
+# Lazy-loaded scan store and inference engines
+_scan_storage = None
 _quick_engine = None
 _privacy_blur = None
 _risk_scorer = None
 
 
+def get_scan_storage():
+    """Lazy load the scan store (Redis with TTL when REDIS_URL is set)."""
+    global _scan_storage
+    if _scan_storage is None:
+        from inference.scan_store import get_scan_store
+        _scan_storage = get_scan_store()
+    return _scan_storage
+
+
 def get_quick_engine():
     """Lazy load quick scan engine."""
     global _quick_engine
@@ -74,6 +144,12 @@ def get_quick_engine():
     return _quick_engine
 
 
+def get_quick_batcher():
+    """Lazy load the frame batcher that serializes access to the quick engine."""
+    from inference.yolo_engine import get_quick_frame_batcher
+    return get_quick_frame_batcher()
+
+
 def get_privacy_blur():
     """Lazy load privacy blur module."""
     global _privacy_blur
@@ -92,6 +168,23 @@ def get_risk_scorer():
     return _risk_scorer
 
 
+# CV defect analyzer singleton (False once loading has failed, so a broken
+# install doesn't retry the import on every frame)
+_cv_analyzer = None
+
+def get_cv_analyzer():
+    """Lazy load the CV defect analyzer (None if it cannot be loaded)."""
+    global _cv_analyzer
+    if _cv_analyzer is None:
+        try:
+            from inference.image_analyzer import get_image_analyzer
+            _cv_analyzer = get_image_analyzer('medium')
+        except Exception as e:
+            logger.warning(f"CV analyzer unavailable: {e}")
+            _cv_analyzer = False
+    return _cv_analyzer or None
+
+
 # Evidence store singleton
 _evidence_store = None
 
@@ -104,20 +197,207 @@ def get_evidence_store():
     return _evidence_store
 
 
-# Snowflake analytics singleton
+# Snowflake analytics singleton (False once loading has failed)
 _snowflake_analytics = None
+# Startup warm-up and request threads may both get here first. Holding it
+# can mean waiting out a Snowflake connect, so async code calls the getter
+# through asyncio.to_thread, never on the event loop.
+_snowflake_analytics_lock = threading.Lock()
 
 def get_snowflake_analytics():
     """Lazy load Snowflake Cortex analytics."""
     global _snowflake_analytics
     if _snowflake_analytics is None:
+        with _snowflake_analytics_lock:
+            if _snowflake_analytics is None:
+                try:
+                    # Share the inference module's instance so the API and the
+                    # risk scorer use one Snowpark session
+                    from inference.snowflake_analytics import get_snowflake_analytics as _get_analytics
+                    _snowflake_analytics = _get_analytics()
+                except Exception as e:
+                    logger.warning(f"Snowflake analytics unavailable: {e}")
+                    _snowflake_analytics = False
+    return _snowflake_analytics or None
+
+
+def _log_warmup_failure(future: "asyncio.Future"):
+    """Done-callback for background warm-ups: log anything they raised."""
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Background warm-up failed: {future.exception()}")
+
+
+# TurboJPEG codec singleton (False once the shared library is known missing)
+_jpeg_codec = None
+
+def get_jpeg_codec():
+    """Lazy load libjpeg-turbo (False if the bindings or library are missing)."""
+    global _jpeg_codec
+    if _jpeg_codec is None:
+        _jpeg_codec = False
+        if HAS_TURBOJPEG:
+            try:
+                _jpeg_codec = TurboJPEG()
+            except (OSError, RuntimeError) as e:
+                logger.warning(f"libjpeg-turbo not found, using OpenCV for JPEG: {e}")
+    return _jpeg_codec
+
+
+def decode_frame(frame_data: str) -> Optional[np.ndarray]:
+    """
+    Decode a base64-encoded WebSocket frame to a BGR image.
+    
+    JPEG frames go straight to libjpeg-turbo when its bindings are
+    available; anything else (or a failed decode) goes through OpenCV.
+    
+    Args:
+        frame_data: Base64-encoded JPEG/PNG bytes
+        
+    Returns:
+        BGR image, or None if the data could not be decoded
+    """
+    frame_bytes = base64.b64decode(frame_data)
+    codec = get_jpeg_codec()
+    
+    # JPEG SOI marker
+    if codec and frame_bytes[:2] == b'\xff\xd8':
         try:
-            from inference.snowflake_analytics import SnowflakeCortexAnalytics
-            _snowflake_analytics = SnowflakeCortexAnalytics()
-        except Exception as e:
-            logger.warning(f"Snowflake analytics unavailable: {e}")
-            _snowflake_analytics = None
-    return _snowflake_analytics
+            return codec.decode(frame_bytes, pixel_format=TJPF_BGR)
+        except (OSError, ValueError):
+            pass
+    
+    nparr = np.frombuffer(frame_bytes, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def encode_annotated_frame(image: np.ndarray) -> str:
+    """
+    Encode an annotated frame as base64 JPEG for the Quick Scan response.
+    
+    The frame is shrunk to ANNOTATED_FRAME_MAX_WIDTH first (the client
+    shows it as an overlay preview), then encoded with libjpeg-turbo
+    when available, else OpenCV.
+    
+    Args:
+        image: BGR annotated image
+        
+    Returns:
+        Base64-encoded JPEG string
+    """
+    h, w = image.shape[:2]
+    if ANNOTATED_FRAME_MAX_WIDTH and w > ANNOTATED_FRAME_MAX_WIDTH:
+        scale = ANNOTATED_FRAME_MAX_WIDTH / w
+        image = cv2.resize(image, (ANNOTATED_FRAME_MAX_WIDTH, max(1, round(h * scale))),
+                           interpolation=cv2.INTER_AREA)
+    
+    codec = get_jpeg_codec()
+    if codec:
+        buffer = codec.encode(image, quality=ANNOTATED_FRAME_JPEG_QUALITY, pixel_format=TJPF_BGR)
+    else:
+        _, buffer = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, ANNOTATED_FRAME_JPEG_QUALITY])
+    return base64.b64encode(buffer).decode('utf-8')
+
+
+def loads_message(data: str) -> Any:
+    """Parse an incoming WebSocket JSON message (raises json.JSONDecodeError)."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+async def send_message(websocket: WebSocket, payload: Dict[str, Any]):
+    """Send a JSON text message, serialized with orjson when available."""
+    if HAS_ORJSON:
+        text = orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS).decode()
+        await websocket.send_text(text)
+    else:
+        await websocket.send_json(payload)
+
+
+def ndjson_line(payload: Any) -> bytes:
+    """Serialize one newline-terminated NDJSON record."""
+    if HAS_ORJSON:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(payload) + '\n').encode('utf-8')
+
+
+def _analyze_frame_cv(cv_analyzer, frame: np.ndarray) -> list:
+    """
+    Run CV-based defect detection for cracks, water damage, mold, rust.
+    
+    Args:
+        cv_analyzer: ImageAnalyzer from get_cv_analyzer(), or None
+        frame: BGR image as numpy array
+        
+    Returns:
+        CV defect detections, or an empty list if the analyzer failed
+    """
+    if cv_analyzer is None:
+        return []
+    
+    try:
+        cv_result = cv_analyzer.analyze(
+            frame,
+            detect_cracks=True,
+            detect_water_damage=True,
+            detect_mold=True,
+            detect_rust=True,
+        )
+        return cv_result.get('defects', [])
+    except Exception as e:
+        logger.debug(f"CV analyzer skipped: {e}")
+        return []
+
+
+class ResponseCache:
+    """
+    TTL cache for GET endpoint payloads, grouped by namespace.
+    
+    Only touched from the event loop, so no locking. Writers call
+    clear(namespace) to invalidate what they change.
+    """
+    
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        # (namespace, key) -> (expires_at, payload), least recently used first
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+    
+    def get(self, namespace: str, key: Hashable) -> Optional[Any]:
+        """Return a cached payload, or None if missing or expired."""
+        if not RESPONSE_CACHE_ENABLED:
+            return None
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._entries[(namespace, key)]
+            return None
+        self._entries.move_to_end((namespace, key))
+        return entry[1]
+    
+    def put(self, namespace: str, key: Hashable, payload: Any, ttl: float):
+        """Cache a payload for ttl seconds, dropping expired entries first."""
+        if not RESPONSE_CACHE_ENABLED:
+            return
+        now = time.monotonic()
+        for cache_key in [k for k, entry in self._entries.items() if entry[0] <= now]:
+            del self._entries[cache_key]
+        
+        self._entries[(namespace, key)] = (now + ttl, payload)
+        self._entries.move_to_end((namespace, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self, namespace: str):
+        """Drop every cached payload in a namespace."""
+        for cache_key in [k for k in self._entries if k[0] == namespace]:
+            del self._entries[cache_key]
+
+
+_response_cache = ResponseCache()
+
+# Background Snowflake connect started at startup (kept so it isn't dropped)
+_snowflake_warmup: Optional["asyncio.Future"] = None
 
 
 @app.on_event("startup")
@@ -126,9 +406,24 @@ async def startup_event():
     logger.info("SafeNest AI Backend starting up...")
     # Optionally pre-load models here
     # get_quick_engine()  # Uncomment to pre-load
+    
+    # Open the long-lived Snowflake session in the background so the first
+    # analytics request doesn't pay the connect + auth round trips
+    global _snowflake_warmup
+    if os.getenv('SNOWFLAKE_ENABLED', 'false').lower() == 'true':
+        _snowflake_warmup = asyncio.get_running_loop().run_in_executor(None, get_snowflake_analytics)
+        _snowflake_warmup.add_done_callback(_log_warmup_failure)
+    
     logger.info("Backend ready!")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release pooled outbound connections."""
+    from inference.roboflow_engine import close_roboflow_engine
+    await close_roboflow_engine()
+
+
 @app.get("/")
 async def root():
     """Health check endpoint."""
@@ -141,7 +436,7 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "active_scans": len([s for s in scan_storage.values() if s.get('status') == 'processing']),
+        "active_scans": await asyncio.to_thread(get_scan_storage().count_processing),
     }
 
 
@@ -162,10 +457,12 @@ async def websocket_quick_scan(websocket: WebSocket):
     scan_id = str(uuid.uuid4())
     frame_count = 0
     all_frame_scores = []
+    last_response = None
     
     logger.info(f"Quick Scan started: {scan_id}")
     
-    engine = get_quick_engine()
+    batcher = get_quick_batcher()
+    cv_analyzer = get_cv_analyzer()
     privacy = get_privacy_blur()
     scorer = get_risk_scorer()
     
@@ -175,45 +472,53 @@ async def websocket_quick_scan(websocket: WebSocket):
             data = await websocket.receive_text()
             
             try:
-                message = json.loads(data)
+                message = loads_message(data)
                 frame_data = message.get('frame', '')
                 
                 if not frame_data:
                     continue
                 
+                # Between strides, answer with the last analysis without
+                # decoding the frame (no new evidence is captured)
+                if last_response is not None and frame_count % QUICK_SCAN_FRAME_STRIDE:
+                    frame_count += 1
+                    await send_message(websocket, {
+                        **last_response,
+                        'frame_number': frame_count,
+                        'evidence_captured': None,
+                        'reused_detections': True,
+                    })
+                    continue
+                
                 # Decode base64 frame
-                frame_bytes = base64.b64decode(frame_data)
-                nparr = np.frombuffer(frame_bytes, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                frame = decode_frame(frame_data)
                 
                 if frame is None:
                     continue
                 
                 frame_count += 1
+                frame_area = frame.shape[0] * frame.shape[1]
                 
-                # Run YOLO detection (for person detection primarily)
-                result = engine.detect(frame, detect_persons=True, detect_defects=True)
+                # Run YOLO detection (for person detection primarily),
+                # batched with frames from other live connections. Boxes are
+                # only drawn when the client asked for the annotated frame.
+                # The CPU-bound CV analyzer runs in a worker thread meanwhile.
+                include_annotated = message.get('include_annotated', False)
+                result, cv_defects = await asyncio.gather(
+                    batcher.detect(
+                        frame, detect_persons=True, detect_defects=True, annotate=include_annotated,
+                    ),
+                    asyncio.to_thread(_analyze_frame_cv, cv_analyzer, frame),
+                )
                 
-                # Run CV-based defect detection for cracks, water damage, mold, rust
+                # Add CV detections
                 all_defects = list(result['defects'])
-                try:
-                    from inference.image_analyzer import get_image_analyzer
-                    cv_analyzer = get_image_analyzer('medium')
-                    cv_result = cv_analyzer.analyze(
-                        frame,
-                        detect_cracks=True,
-                        detect_water_damage=True,
-                        detect_mold=True,
-                        detect_rust=True,
-                    )
-                    # Add CV detections
-                    all_defects.extend(cv_result.get('defects', []))
-                except Exception as e:
-                    logger.debug(f"CV analyzer skipped: {e}")
+                all_defects.extend(cv_defects)
                 
                 # Apply privacy blur BEFORE any storage
                 if result['persons']:
-                    blurred_frame = privacy.apply_blur(frame, result['persons'])
+                    # The decoded frame is ours, so blur it in place
+                    blurred_frame = privacy.apply_blur(frame, result['persons'], out=frame)
                     privacy.log_enforcement(scan_id, frame_count, len(result['persons']))
                 else:
                     blurred_frame = frame
@@ -222,15 +527,17 @@ async def websocket_quick_scan(websocket: WebSocket):
                 user_context = message.get('user_context', None)
                 score_result = scorer.calculate_score(
                     all_defects,  # Use combined defects
-                    frame.shape[0] * frame.shape[1],
+                    frame_area,
                     user_context=user_context,
                 )
                 all_frame_scores.append(score_result)
                 
                 # Capture evidence if defects detected
                 evidence_captured = None
-                if all_defects:
-                    evidence_store = get_evidence_store()
+                evidence_store = get_evidence_store()
+                if all_defects and not evidence_store.budget_exhausted(
+                    scan_id, max(d.get('confidence', 0) for d in all_defects)
+                ):
                     evidence = evidence_store.save_evidence(
                         frame=blurred_frame,  # Use privacy-blurred frame
                         detections=all_defects,
@@ -260,17 +567,19 @@ async def websocket_quick_scan(websocket: WebSocket):
                 }
                 
                 # Optionally include annotated frame
-                if all_defects and message.get('include_annotated', False):
-                    _, buffer = cv2.imencode('.jpg', result['annotated_image'], [cv2.IMWRITE_JPEG_QUALITY, 80])
-                    response['annotated_frame'] = base64.b64encode(buffer).decode('utf-8')
+                if all_defects and include_annotated:
+                    response['annotated_frame'] = await asyncio.to_thread(
+                        encode_annotated_frame, result['annotated_image']
+                    )
                 
-                await websocket.send_json(response)
+                await send_message(websocket, response)
+                last_response = response
                 
             except json.JSONDecodeError:
                 logger.error("Invalid JSON received")
             except Exception as e:
                 logger.error(f"Frame processing error: {e}")
-                await websocket.send_json({'error': str(e)})
+                await send_message(websocket, {'error': str(e)})
     
     except WebSocketDisconnect:
         logger.info(f"Quick Scan ended: {scan_id}, frames processed: {frame_count}")
@@ -278,19 +587,80 @@ async def websocket_quick_scan(websocket: WebSocket):
         # Generate final summary
         if all_frame_scores:
             final_score = scorer.aggregate_scores(all_frame_scores)
-            scan_storage[scan_id] = {
+            await asyncio.to_thread(get_scan_storage().set, scan_id, {
                 'type': 'quick',
                 'status': 'complete',
                 'frames_processed': frame_count,
                 'result': final_score,
                 'completed_at': datetime.now().isoformat(),
-            }
+            })
 
 
 # =============================================================================
 # DEEP SCAN - WebSocket Endpoint (Live Camera)
 # =============================================================================
 
+class VideoRecorder:
+    """
+    Writes a camera session to MP4 on a background thread.
+    
+    The WebSocket loop only enqueues frames, so encoder and disk stalls
+    never block the event loop. The writer is opened at the size of the
+    first frame.
+    """
+    
+    def __init__(self, video_path: Path, fps: float = 10.0):
+        self.video_path = video_path
+        self.fps = fps
+        self._frames: "queue.Queue[Optional[np.ndarray]]" = queue.Queue(maxsize=DEEP_SCAN_VIDEO_QUEUE_SIZE)
+        # Set once encoding fails; later frames are drained and dropped
+        self.failed = False
+        self._thread = threading.Thread(target=self._writer_loop, name='video-writer', daemon=True)
+        self._thread.start()
+    
+    async def write(self, frame: np.ndarray):
+        """Queue a frame, waiting off the event loop if the writer is behind."""
+        if self.failed:
+            return
+        try:
+            self._frames.put_nowait(frame)
+        except queue.Full:
+            await asyncio.to_thread(self._frames.put, frame)
+    
+    async def close(self):
+        """Flush queued frames and release the writer."""
+        await asyncio.to_thread(self._frames.put, None)
+        await asyncio.to_thread(self._thread.join)
+    
+    def _writer_loop(self):
+        """Encode queued frames until the None sentinel arrives."""
+        out_video = None
+        # Keeps consuming after an error, so write() and close() never
+        # block on a full queue
+        while True:
+            frame = self._frames.get()
+            if frame is None:
+                break
+            if self.failed:
+                continue
+            
+            try:
+                # Init video writer on first frame
+                if out_video is None:
+                    height, width = frame.shape[:2]
+                    # MJPG is safer for generic MP4 in OpenCV
+                    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+                    out_video = cv2.VideoWriter(str(self.video_path), fourcc, self.fps, (width, height))
+                
+                out_video.write(frame)
+            except Exception as e:
+                logger.error(f"Video writer error for {self.video_path.name}: {e}")
+                self.failed = True
+        
+        if out_video:
+            out_video.release()
+
+
 @app.websocket("/ws/scan/deep")
 async def websocket_deep_scan(websocket: WebSocket):
     """
@@ -305,20 +675,21 @@ async def websocket_deep_scan(websocket: WebSocket):
     temp_dir = Path(tempfile.mkdtemp())
     video_path = temp_dir / f"{scan_id}_recording.mp4"
     
-    # Initialize video writer (will be set on first frame)
-    out_video = None
+    # Video frames are encoded on a background thread
+    recorder = VideoRecorder(video_path)
     
-    scan_storage[scan_id] = {
+    scan_storage = get_scan_storage()
+    await asyncio.to_thread(scan_storage.set, scan_id, {
         'type': 'deep',
         'status': 'recording',
         'started_at': datetime.now().isoformat(),
         'temp_dir': str(temp_dir),
-    }
+    })
     
     logger.info(f"Deep Scan Camera started: {scan_id}")
     
     # We use Quick engine for real-time feedback while recording
-    quick_engine = get_quick_engine() 
+    quick_batcher = get_quick_batcher()
     user_context = None
     
     try:
@@ -326,7 +697,7 @@ async def websocket_deep_scan(websocket: WebSocket):
             data = await websocket.receive_text()
             
             try:
-                message = json.loads(data)
+                message = loads_message(data)
                 
                 if 'user_context' in message:
                     user_context = message['user_context']
@@ -339,28 +710,19 @@ async def websocket_deep_scan(websocket: WebSocket):
                     continue
                     
                 # Decode frame
-                frame_bytes = base64.b64decode(frame_data)
-                nparr = np.frombuffer(frame_bytes, np.uint8)
-                frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+                frame = decode_frame(frame_data)
                 
                 if frame is None:
                     continue
                     
-                # Init video writer on first frame
-                if out_video is None:
-                    height, width = frame.shape[:2]
-                    # MJPG is safer for generic MP4 in OpenCV
-                    fourcc = cv2.VideoWriter_fourcc(*'mp4v') 
-                    out_video = cv2.VideoWriter(str(video_path), fourcc, 10.0, (width, height))
-                
                 # Write to video
-                out_video.write(frame)
+                await recorder.write(frame)
                 
                 # Real-time feedback detection
-                result = quick_engine.detect(frame, detect_persons=True, detect_defects=True)
+                result = await quick_batcher.detect(frame, detect_persons=True, detect_defects=True)
                 
                 # Send feedback
-                await websocket.send_json({
+                await send_message(websocket, {
                     'scan_id': scan_id,
                     'status': 'recording',
                     'defects': result['defects'],
@@ -375,12 +737,11 @@ async def websocket_deep_scan(websocket: WebSocket):
     except Exception as e:
         logger.error(f"Deep Scan stream error: {e}")
     finally:
-        if out_video:
-            out_video.release()
+        await recorder.close()
             
         # Trigger deep analysis if video exists
         if video_path.exists() and video_path.stat().st_size > 0:
-            scan_storage[scan_id]['status'] = 'processing'
+            await asyncio.to_thread(scan_storage.update, scan_id, {'status': 'processing'})
             asyncio.create_task(_run_deep_scan(
                 scan_id=scan_id,
                 image_paths=[],
@@ -440,14 +801,14 @@ async def start_deep_scan(
             document_paths.append(file_path)
     
     # Initialize scan status
-    scan_storage[scan_id] = {
+    await asyncio.to_thread(get_scan_storage().set, scan_id, {
         'type': 'deep',
         'status': 'processing',
         'progress': 0,
         'started_at': datetime.now().isoformat(),
         'files_count': len(files),
         'temp_dir': str(temp_dir),
-    }
+    })
     
     # Start async processing
     asyncio.create_task(_run_deep_scan(scan_id, image_paths, video_paths, document_paths, temp_dir, user_context=context_data))
@@ -468,13 +829,14 @@ async def _run_deep_scan(
     user_context: Optional[dict] = None,
 ):
     """Background task for deep scan processing."""
+    scan_storage = get_scan_storage()
     try:
         from inference.deep_analyzer import get_deep_analyzer
         
         analyzer = get_deep_analyzer()
         
         # Update progress
-        scan_storage[scan_id]['progress'] = 10
+        await asyncio.to_thread(scan_storage.update, scan_id, {'progress': 10})
         
         # Run analysis
         result = await analyzer.analyze(
@@ -486,7 +848,7 @@ async def _run_deep_scan(
         )
         
         # Update storage with results
-        scan_storage[scan_id].update({
+        await asyncio.to_thread(scan_storage.update, scan_id, {
             'status': 'complete',
             'progress': 100,
             'completed_at': datetime.now().isoformat(),
@@ -508,18 +870,19 @@ async def _run_deep_scan(
         
         # Store to Snowflake Analytics
         try:
-            from inference.snowflake_analytics import get_snowflake_analytics
-            analytics = get_snowflake_analytics()
+            # Off the loop: may wait for the startup connect to finish
+            analytics = await asyncio.to_thread(get_snowflake_analytics)
             
-            analytics.store_scan_result(
-                scan_id=scan_id,
-                scan_type='deep',
-                risk_score=result.risk_score,
-                risk_level=result.risk_level,
-                defects=result.defects,
-                user_context=user_context,
-                processing_time=result.processing_time_seconds
-            )
+            if analytics is not None:
+                analytics.store_scan_result(
+                    scan_id=scan_id,
+                    scan_type='deep',
+                    risk_score=result.risk_score,
+                    risk_level=result.risk_level,
+                    defects=result.defects,
+                    user_context=user_context,
+                    processing_time=result.processing_time_seconds
+                )
         except Exception as e:
             logger.error(f"Failed to store analytics: {e}")
         
@@ -527,7 +890,7 @@ async def _run_deep_scan(
         
     except Exception as e:
         logger.error(f"Deep scan error: {scan_id}, {e}")
-        scan_storage[scan_id].update({
+        await asyncio.to_thread(scan_storage.update, scan_id, {
             'status': 'error',
             'error': str(e),
         })
@@ -542,10 +905,9 @@ async def _run_deep_scan(
 @app.get("/api/scan/status/{scan_id}")
 async def get_scan_status(scan_id: str):
     """Get status of a scan."""
-    if scan_id not in scan_storage:
+    scan = await asyncio.to_thread(get_scan_storage().get, scan_id)
+    if scan is None:
         raise HTTPException(status_code=404, detail="Scan not found")
-    
-    scan = scan_storage[scan_id]
     return {
         'scan_id': scan_id,
         'type': scan.get('type'),
@@ -557,11 +919,10 @@ async def get_scan_status(scan_id: str):
 @app.get("/api/scan/report/{scan_id}")
 async def get_scan_report(scan_id: str):
     """Get full report for a completed scan."""
-    if scan_id not in scan_storage:
+    scan = await asyncio.to_thread(get_scan_storage().get, scan_id)
+    if scan is None:
         raise HTTPException(status_code=404, detail="Scan not found")
     
-    scan = scan_storage[scan_id]
-    
     if scan.get('status') != 'complete':
         raise HTTPException(status_code=400, detail="Scan not yet complete")
     
@@ -578,19 +939,52 @@ async def get_scan_report(scan_id: str):
 # =============================================================================
 
 @app.get("/api/evidence/{scan_id}")
-async def get_scan_evidence(scan_id: str, include_images: bool = False):
+async def get_scan_evidence(
+    scan_id: str,
+    include_images: bool = False,
+    include_summary: bool = True,
+    stream: bool = False,
+):
     """
     Get all captured evidence for a scan.
     
     Args:
         scan_id: Scan identifier
         include_images: If true, include base64 thumbnails
+        include_summary: If false, omit the per-scan summary (list views)
+        stream: If true, respond with NDJSON: a header line (scan_id,
+            evidence_count, summary) followed by one line per item
         
     Returns:
         List of evidence items with detection details
     """
     evidence_store = get_evidence_store()
-    evidence_list = evidence_store.get_evidence(scan_id, include_images=include_images)
+    
+    if stream:
+        count, items, summary = evidence_store.iter_evidence(
+            scan_id, include_images=include_images, include_summary=include_summary,
+        )
+        
+        def ndjson_lines():
+            header = {'scan_id': scan_id, 'evidence_count': count}
+            if summary is not None:
+                header['summary'] = summary
+            yield ndjson_line(header)
+            for item in items:
+                yield ndjson_line(item)
+        
+        return StreamingResponse(ndjson_lines(), media_type='application/x-ndjson')
+    
+    # Payloads with inline base64 images are too large to keep around
+    cache_key = (scan_id, include_summary)
+    if not include_images:
+        cached = _response_cache.get('evidence', cache_key)
+        if cached is not None:
+            return cached
+    
+    evidence_list, summary = evidence_store.get_evidence_with_summary(
+        scan_id, include_images=include_images, include_summary=include_summary,
+    )
     
     if not evidence_list:
         return {
@@ -599,35 +993,49 @@ async def get_scan_evidence(scan_id: str, include_images: bool = False):
             'evidence': [],
         }
     
-    summary = evidence_store.get_scan_summary(scan_id)
-    
-    return {
+    response = {
         'scan_id': scan_id,
         'evidence_count': len(evidence_list),
-        'summary': summary,
         'evidence': evidence_list,
     }
+    if summary is not None:
+        response['summary'] = summary
+    if not include_images:
+        _response_cache.put('evidence', cache_key, response, ttl=10)
+    return response
 
 
 @app.get("/api/evidence/{scan_id}/{evidence_id}/image")
-async def get_evidence_image(scan_id: str, evidence_id: str, thumbnail: bool = False):
+async def get_evidence_image(request: Request, scan_id: str, evidence_id: str, thumbnail: bool = False):
     """
     Get a specific evidence image.
     
+    Evidence images are immutable, so responses carry a strong ETag and a
+    long Cache-Control; a matching If-None-Match gets a 304 without the
+    image being read.
+    
     Args:
         scan_id: Scan identifier
         evidence_id: Evidence item identifier
         thumbnail: If true, return thumbnail instead of full image
     """
-    from fastapi.responses import Response
-    
     evidence_store = get_evidence_store()
-    image_bytes = evidence_store.get_evidence_image(scan_id, evidence_id, thumbnail=thumbnail)
+    etag = evidence_store.get_evidence_etag(scan_id, evidence_id, thumbnail=thumbnail)
+    if etag is None:
+        raise HTTPException(status_code=404, detail="Evidence image not found")
     
+    headers = {'ETag': etag, 'Cache-Control': 'private, max-age=3600, immutable'}
+    if_none_match = request.headers.get('if-none-match', '')
+    if etag in (tag.strip() for tag in if_none_match.split(',')) or if_none_match.strip() == '*':
+        return Response(status_code=304, headers=headers)
+    
+    image_bytes = await asyncio.to_thread(
+        evidence_store.get_evidence_image, scan_id, evidence_id, thumbnail=thumbnail
+    )
     if image_bytes is None:
         raise HTTPException(status_code=404, detail="Evidence image not found")
     
-    return Response(content=image_bytes, media_type="image/jpeg")
+    return Response(content=image_bytes, media_type="image/jpeg", headers=headers)
 
 
 # =============================================================================
@@ -642,7 +1050,7 @@ async def get_analytics_trends(days: int = 30):
     Returns aggregated analytics across all scans.
     Requires Snowflake configuration to be set.
     """
-    analytics = get_snowflake_analytics()
+    analytics = await asyncio.to_thread(get_snowflake_analytics)
     
     if analytics is None:
         return {
@@ -650,11 +1058,26 @@ async def get_analytics_trends(days: int = 30):
             'message': 'Snowflake Cortex AI not configured. Set SNOWFLAKE_ENABLED=true and configure credentials.',
         }
     
-    return analytics.get_trend_analysis(days=days)
+    cached = _response_cache.get('trends', days)
+    if cached is not None:
+        return cached
+    
+    # Snowpark calls block; run them off the event loop
+    trends = await asyncio.to_thread(analytics.get_trend_analysis, days=days)
+    # Failed queries are not cached so the next request retries
+    if trends.get('enabled'):
+        _response_cache.put('trends', days, trends, ttl=30)
+    return trends
+
+
+class AnalyzeRequest(BaseModel):
+    """Body of POST /api/analytics/analyze."""
+    defects: List[Dict[str, Any]] = []
+    user_context: Optional[Dict[str, Any]] = None
 
 
 @app.post("/api/analytics/analyze")
-async def analyze_defects_with_ai(request: dict):
+async def analyze_defects_with_ai(request: AnalyzeRequest):
     """
     Get AI-powered analysis of defects using Snowflake Cortex.
     
@@ -662,10 +1085,10 @@ async def analyze_defects_with_ai(request: dict):
         defects: List of defect objects
         user_context: Optional user-provided context (building_age, climate, etc.)
     """
-    defects = request.get('defects', [])
-    user_context = request.get('user_context', None)
+    defects = request.defects
+    user_context = request.user_context
     
-    analytics = get_snowflake_analytics()
+    analytics = await asyncio.to_thread(get_snowflake_analytics)
     
     if analytics is None:
         # Use local fallback analysis
@@ -680,7 +1103,7 @@ async def analyze_defects_with_ai(request: dict):
             }
         }
     
-    result = analytics.analyze_with_cortex(defects, user_context)
+    result = await asyncio.to_thread(analytics.analyze_with_cortex, defects, user_context)
     
     return {
         'source': 'snowflake_cortex',
@@ -701,10 +1124,20 @@ async def get_scan_analytics_summary(scan_id: str):
     
     Uses Snowflake Cortex SUMMARIZE if available.
     """
-    if scan_id not in scan_storage:
+    scan = await asyncio.to_thread(get_scan_storage().get, scan_id)
+    if scan is None:
         raise HTTPException(status_code=404, detail="Scan not found")
     
-    scan = scan_storage[scan_id]
+    # Keyed on completion time so a scan finishing invalidates its summary.
+    # Misses don't re-run Cortex for an unchanged scan either:
+    # generate_ai_summary memoizes SUMMARIZE on its input (defect text and
+    # risk score) for CORTEX_CACHE_TTL, and template fallbacks after a
+    # Cortex failure only live here for the short TTL below.
+    cache_key = (scan_id, scan.get('completed_at'))
+    cached = _response_cache.get('summary', cache_key)
+    if cached is not None:
+        return cached
+    
     defects = []
     risk_score = 0
     
@@ -712,78 +1145,248 @@ async def get_scan_analytics_summary(scan_id: str):
         defects = scan['result'].get('defects', [])
         risk_score = scan['result'].get('score', 0)
     
-    analytics = get_snowflake_analytics()
+    analytics = await asyncio.to_thread(get_snowflake_analytics)
     
     if analytics:
-        summary = analytics.generate_ai_summary(scan_id, defects, risk_score)
+        summary = await asyncio.to_thread(analytics.generate_ai_summary, scan_id, defects, risk_score)
     else:
         # Local fallback
         defect_count = len(defects)
         summary = f"Inspection analyzed {defect_count} defect(s). Risk score: {risk_score}/100."
     
-    return {
+    response = {
         'scan_id': scan_id,
         'ai_summary': summary,
         'source': 'snowflake_cortex' if analytics else 'local',
     }
+    _response_cache.put('summary', cache_key, response, ttl=60)
+    return response
 
 
 # =============================================================================
 # Scan History API
 # =============================================================================
 
-# File-based history storage (use database in production)
+def get_shared_history():
+    """Redis-backed scan history shared by all workers (None without REDIS_URL)."""
+    from inference.scan_store import get_redis_history
+    return get_redis_history()
+
+
+# File-based history storage when Redis is not configured
 HISTORY_FILE = Path(__file__).parent / "scan_history.json"
-_scan_history: list = []
+# Scan id -> history item, newest first (stored on disk as a list)
+_scan_history: "OrderedDict[Any, dict]" = OrderedDict()
+
+# mtime (ns) of the history file last loaded or written; None until loaded
+_history_mtime: Optional[int] = None
+
+# This worker's changes since its last save: scan id -> saved item, or None
+# if deleted. Replayed over the file whenever it is re-read, so a save
+# merges with what other workers wrote instead of overwriting it
+_history_changes: "OrderedDict[Any, Optional[dict]]" = OrderedDict()
+HISTORY_MAX_ITEMS = 100
+
+# History file I/O runs in worker threads; this keeps one request's
+# load/modify/save from interleaving with another's
+_history_lock = asyncio.Lock()
+
+# Writes are coalesced: requests mark history dirty and a background task
+# saves it this many seconds later (and once more on shutdown)
+HISTORY_FLUSH_DELAY_S = float(os.getenv('HISTORY_FLUSH_DELAY_S', 1.0))
+_history_dirty = asyncio.Event()
+_history_flush_task: Optional[asyncio.Task] = None
+
+
+def _apply_history_change(history: "OrderedDict[Any, dict]", scan_id: Any, item: Optional[dict]):
+    """Save (move to the front) or delete (item None) one history entry."""
+    if item is None:
+        history.pop(scan_id, None)
+        return
+    history[scan_id] = item
+    history.move_to_end(scan_id, last=False)
+    while len(history) > HISTORY_MAX_ITEMS:
+        history.popitem(last=True)
+
+
+def _record_history_change(scan_id: Any, item: Optional[dict]):
+    """Apply a change in memory and queue it for the next save."""
+    _apply_history_change(_scan_history, scan_id, item)
+    _history_changes[scan_id] = item
+    _history_changes.move_to_end(scan_id)
+    _history_dirty.set()
 
 
 def _load_history():
-    """Load scan history from file."""
-    global _scan_history
-    if HISTORY_FILE.exists():
-        try:
-            with open(HISTORY_FILE, 'r') as f:
-                _scan_history = json.load(f)
-        except Exception as e:
-            logger.warning(f"Failed to load history: {e}")
-            _scan_history = []
+    """Load scan history from file (re-read only if it changed on disk)."""
+    global _scan_history, _history_mtime
+    try:
+        mtime = HISTORY_FILE.stat().st_mtime_ns
+    except FileNotFoundError:
+        return _scan_history
+    
+    if mtime == _history_mtime:
+        return _scan_history
+    
+    history = OrderedDict()
+    try:
+        data = HISTORY_FILE.read_bytes()
+        items = orjson.loads(data) if HAS_ORJSON else json.loads(data)
+        for item in items:
+            # Files written before ids were unique: the newest copy wins
+            history.setdefault(item.get('id'), item)
+    except Exception as e:
+        logger.warning(f"Failed to load history: {e}")
+    
+    # Unsaved changes are newer than the file
+    for scan_id, item in _history_changes.items():
+        _apply_history_change(history, scan_id, item)
+    _scan_history = history
+    _history_mtime = mtime
     return _scan_history
 
 
-def _save_history():
-    """Save scan history to file."""
+def _save_history() -> bool:
+    """
+    Merge pending changes into the history file and save it.
+    
+    The file is re-read (under an advisory lock where available) first, so
+    entries written by other workers are kept.
+    
+    Returns:
+        True if the file was written
+    """
+    global _history_mtime
+    # Per-process temp name: workers must not share one
+    tmp_file = HISTORY_FILE.with_suffix(f'.json.{os.getpid()}.tmp')
+    lock_fd = None
     try:
-        with open(HISTORY_FILE, 'w') as f:
-            json.dump(_scan_history, f, indent=2)
+        if HAS_FCNTL:
+            lock_fd = os.open(HISTORY_FILE.with_suffix('.json.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+        
+        items = list(_load_history().values())
+        if HAS_ORJSON:
+            data = orjson.dumps(items)
+        else:
+            data = json.dumps(items, separators=(',', ':')).encode('utf-8')
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            os.write(fd, data)
+            mtime = os.fstat(fd).st_mtime_ns
+        finally:
+            os.close(fd)
+        os.replace(tmp_file, HISTORY_FILE)
+        _history_mtime = mtime
+        _history_changes.clear()
+        return True
     except Exception as e:
         logger.error(f"Failed to save history: {e}")
+        return False
+    finally:
+        if lock_fd is not None:
+            os.close(lock_fd)
+
+
+async def _flush_history():
+    """Save history if it has unsaved changes."""
+    async with _history_lock:
+        if not _history_dirty.is_set():
+            return
+        save = asyncio.ensure_future(asyncio.to_thread(_save_history))
+        try:
+            saved = await asyncio.shield(save)
+        except asyncio.CancelledError:
+            # Cancelling doesn't stop the worker thread: keep holding the
+            # lock until its save is done, so no other save overlaps it
+            await asyncio.wait([save])
+            if not save.exception() and save.result():
+                _history_dirty.clear()
+            raise
+        # Stays dirty after a failed save, so the next pass retries
+        if saved:
+            _history_dirty.clear()
+
+
+async def _history_flush_loop():
+    """Save dirty history at most once per HISTORY_FLUSH_DELAY_S."""
+    while True:
+        await _history_dirty.wait()
+        await asyncio.sleep(HISTORY_FLUSH_DELAY_S)
+        await _flush_history()
+
+
+@app.on_event("startup")
+async def start_history_flush():
+    """Load file-backed history and start the background history writer."""
+    global _history_flush_task
+    # Connects the scan store (Redis ping) and reads the file up front, so
+    # the first history request doesn't pay for either
+    try:
+        if await asyncio.to_thread(get_shared_history) is None:
+            async with _history_lock:
+                await asyncio.to_thread(_load_history)
+    except Exception as e:
+        logger.warning(f"History preload skipped: {e}")
+    _history_flush_task = asyncio.create_task(_history_flush_loop())
+
+
+@app.on_event("shutdown")
+async def stop_history_flush():
+    """Stop the background history writer and save pending changes."""
+    if _history_flush_task is not None:
+        _history_flush_task.cancel()
+        # Returns once a save already in progress has finished (the task
+        # holds _history_lock until then); the final flush takes the lock too
+        try:
+            await _history_flush_task
+        except asyncio.CancelledError:
+            pass
+    await _flush_history()
 
 
 @app.get("/api/history")
 async def get_scan_history():
     """Get all scan history."""
-    history = _load_history()
-    return {
+    shared = get_shared_history()
+    if shared is not None:
+        # Not response-cached: other workers write to the same list
+        history = await asyncio.to_thread(shared.items)
+        return {
+            'scans': history,
+            'count': len(history),
+        }
+    
+    cached = _response_cache.get('history', None)
+    if cached is not None:
+        return cached
+    
+    async with _history_lock:
+        history = list((await asyncio.to_thread(_load_history)).values())
+    response = {
         'scans': history,
         'count': len(history),
     }
+    _response_cache.put('history', None, response, ttl=10)
+    return response
 
 
 @app.post("/api/history")
 async def save_to_history(item: dict):
     """Save a scan result to history."""
-    _load_history()
-    
-    # Remove duplicates
-    _scan_history[:] = [h for h in _scan_history if h.get('id') != item.get('id')]
-    
-    # Add new item at start
-    _scan_history.insert(0, item)
+    shared = get_shared_history()
+    if shared is not None:
+        await asyncio.to_thread(shared.save, item)
+        logger.info(f"Saved scan {item.get('id')} to history")
+        return {'status': 'saved', 'id': item.get('id')}
     
-    # Keep only last 100 scans
-    _scan_history[:] = _scan_history[:100]
-    
-    _save_history()
+    async with _history_lock:
+        await asyncio.to_thread(_load_history)
+        
+        # Replace any earlier copy and move the item to the front
+        # (keeping only the last HISTORY_MAX_ITEMS scans)
+        _record_history_change(item.get('id'), item)
+        _response_cache.clear('history')
     
     logger.info(f"Saved scan {item.get('id')} to history")
     
@@ -793,27 +1396,43 @@ async def save_to_history(item: dict):
 @app.delete("/api/history/{scan_id}")
 async def delete_from_history(scan_id: str):
     """Delete a scan from history."""
-    _load_history()
-    
-    original_len = len(_scan_history)
-    _scan_history[:] = [h for h in _scan_history if h.get('id') != scan_id]
-    
-    if len(_scan_history) < original_len:
-        _save_history()
-        return {'status': 'deleted', 'id': scan_id}
-    else:
+    shared = get_shared_history()
+    if shared is not None:
+        if await asyncio.to_thread(shared.delete, scan_id):
+            return {'status': 'deleted', 'id': scan_id}
         raise HTTPException(status_code=404, detail="Scan not found")
+    
+    async with _history_lock:
+        await asyncio.to_thread(_load_history)
+        
+        if scan_id in _scan_history:
+            _record_history_change(scan_id, None)
+            _response_cache.clear('history')
+            return {'status': 'deleted', 'id': scan_id}
+        else:
+            raise HTTPException(status_code=404, detail="Scan not found")
 
 
 # =============================================================================
 # Main Entry Point
 # =============================================================================
 
+# Server processes; every worker loads its own models, and scan status is
+# only shared between workers when REDIS_URL is set
+UVICORN_WORKERS = int(os.getenv('UVICORN_WORKERS', 1))
+
+# Auto-reload for development (file watching; forces a single worker)
+UVICORN_RELOAD = os.getenv('UVICORN_RELOAD', '0').lower() in ('1', 'true')
+
 if __name__ == "__main__":
+    # loop/http 'auto' pick uvloop and httptools (uvicorn[standard])
     uvicorn.run(
         "main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=UVICORN_RELOAD,
+        workers=1 if UVICORN_RELOAD else UVICORN_WORKERS,
+        loop="auto",
+        http="auto",
         log_level="info",
     )